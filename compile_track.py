@@ -0,0 +1,41 @@
+import argparse
+import os
+from pathlib import Path
+
+from acdg.mesh import get_default_bundle_path, maybe_compile_track
+from acdg.utils.load import load_yaml
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Compiles a track mesh for data generation. Only .obj files"
+        " with triangular faces and positive vertex indexes are supported,"
+        " export meshes from Blender with Triangulate Faces enabled.",
+    )
+    parser.add_argument("config", type=str, help="Configuration file in configs/")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Recompile the track even if the compiled track is up to date",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    root_path = Path(os.path.dirname(__file__))
+    config = load_yaml(root_path.joinpath("configs").joinpath(args.config))
+    track_mesh_path = Path(config["track_mesh_path"])
+    bundle_path = config.get("compiled_track_path")
+    if bundle_path is None:
+        bundle_path = get_default_bundle_path(track_mesh_path)
+    maybe_compile_track(
+        track_mesh_path,
+        config["track_name"],
+        Path(bundle_path),
+        args.force,
+    )
+
+
+if __name__ == "__main__":
+    main()
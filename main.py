@@ -2,14 +2,14 @@ import os
 import sys
 from pathlib import Path
 
-from acdg.generate_data import MultiprocessDataGenerator
+from acdg.generate_data import create_data_generator
 
 
 def main():
     config_path = sys.argv[1]
     root_path = Path(os.path.dirname(__file__))
     config_path = root_path.joinpath("configs").joinpath(config_path)
-    data_generator = MultiprocessDataGenerator(config_path)
+    data_generator = create_data_generator(config_path)
     data_generator.start()
 
 
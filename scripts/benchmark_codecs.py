@@ -0,0 +1,114 @@
+import argparse
+from collections import defaultdict
+from pathlib import Path
+import time
+
+from acdg.workers.generator.codecs import create_output_codec, is_supported_by_codec
+import cv2
+import numpy as np
+from prettytable import PrettyTable
+
+CODEC_SETTINGS = {
+    "png": {"codec": "png"},
+    "png 1": {"codec": "png", "compression": 1},
+    "png 9": {"codec": "png", "compression": 9},
+    "webp": {"codec": "webp"},
+    "npy": {"codec": "npy"},
+    "zlib 1": {"codec": "zlib", "level": 1},
+    "zlib 6": {"codec": "zlib", "level": 6},
+    "lz4": {"codec": "lz4"},
+}
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output_path", type=str, help="Folder of generated data")
+    parser.add_argument("--codecs", nargs="+", default=list(CODEC_SETTINGS))
+    parser.add_argument("--n-frames", type=int, default=20)
+    return parser.parse_args()
+
+
+def load_generated_outputs(output_path: Path, n_frames: int) -> dict:
+    """
+    Loads up to n_frames of each type of generated PNG and .npy output, keyed
+        by the output's name.
+    """
+    outputs = defaultdict(list)
+    filepaths = [*output_path.glob("*-*.png"), *output_path.glob("*-*.npy")]
+    for filepath in sorted(filepaths):
+        output_name = filepath.stem.split("-", 1)[1]
+        if len(outputs[output_name]) < n_frames:
+            outputs[output_name].append(load_output(filepath))
+    return outputs
+
+
+def load_output(filepath: Path) -> np.array:
+    """
+    Loads a generated output saved as a PNG or .npy file.
+    """
+    if filepath.suffix == ".npy":
+        return np.load(filepath, allow_pickle=False)
+    return cv2.imread(str(filepath), cv2.IMREAD_UNCHANGED)
+
+
+def get_channels(frame: np.array) -> int:
+    """
+    Returns an output's number of channels, 0 for a single channel.
+    """
+    return frame.shape[2] if frame.ndim == 3 else 0
+
+
+def time_codec(codec, frames: list) -> tuple:
+    """
+    Returns the mean encode time in milliseconds and size in bytes per frame,
+        checking each frame decodes back to the original.
+    """
+    encode_time, n_bytes = 0.0, 0
+    for frame in frames:
+        start = time.perf_counter()
+        encoded = codec.encode(frame)
+        encode_time += time.perf_counter() - start
+        n_bytes += len(encoded)
+        decoded = codec.decode(encoded)
+        if decoded.ndim > frame.ndim:
+            decoded = decoded[..., 0]
+        assert np.array_equal(decoded, frame), "Codec is not lossless"
+    return encode_time / len(frames) * 1000, n_bytes / len(frames)
+
+
+def create_codecs(names: list) -> dict:
+    """
+    Creates each named codec, skipping any whose dependencies are missing.
+    """
+    codecs = {}
+    for name in names:
+        try:
+            codecs[name] = create_output_codec(CODEC_SETTINGS[name])
+        except ImportError as error:
+            print(f"Skipping {name}: {error}")
+    return codecs
+
+
+def main():
+    args = parse_arguments()
+    outputs = load_generated_outputs(Path(args.output_path), args.n_frames)
+    codecs = create_codecs(args.codecs)
+    table = PrettyTable(["Output", "Codec", "Encode ms/frame", "KB/frame", "Ratio"])
+    for output_name, frames in outputs.items():
+        raw_bytes = frames[0].nbytes
+        channels, dtype = get_channels(frames[0]), frames[0].dtype
+        for name, codec in codecs.items():
+            if not is_supported_by_codec(codec, channels, dtype):
+                table.add_row([output_name, name, "-", "-", "unsupported"])
+                continue
+            encode_ms, n_bytes = time_codec(codec, frames)
+            ratio = raw_bytes / n_bytes
+            row = [output_name, name, f"{encode_ms:.2f}", f"{n_bytes / 1024:.1f}"]
+            table.add_row([*row, f"{ratio:.1f}x"])
+    shape = {name: frames[0].shape for name, frames in outputs.items()}
+    print(f"Outputs: {shape}")
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
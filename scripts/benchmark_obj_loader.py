@@ -0,0 +1,164 @@
+import argparse
+import io
+from pathlib import Path
+import tempfile
+import time
+
+from acdg.mesh.compile import (
+    compile_track_bundle,
+    convert_geometries_to_track_bundle,
+)
+from acdg.mesh.load import find_group_and_material_lines
+from acdg.tracks import TRACK_DATA
+import numpy as np
+from prettytable import PrettyTable
+import trimesh
+
+PHYSICS_MATERIAL_LINE = b"usemtl physics"
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--track-name", type=str, default="monza")
+    parser.add_argument("--n-groups", type=int, default=2000)
+    parser.add_argument("--triangles-per-group", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=3)
+    return parser.parse_args()
+
+
+def write_synthetic_track(
+    track_mesh: Path,
+    track_name: str,
+    n_groups: int,
+    triangles_per_group: int,
+):
+    """
+    Writes an OBJ file laid out like a track exported from the game, one vertex
+        group per block of v, vt, usemtl and f records. Groups cycle through
+        the track's materials including physics and removed geometries, and
+        one group is in VERTEX_GROUPS_TO_MODIFY if the track has any.
+    """
+    rng = np.random.default_rng(0)
+    track_data = TRACK_DATA[track_name]
+    materials = list(track_data.material_to_semantics)[:16]
+    materials += ["physics"] + list(track_data.geometries_to_remove)[:2]
+    mtl_path = track_mesh.with_suffix(".mtl")
+    mtl_path.write_text(
+        "".join(f"newmtl {name}\nKd 0.5 0.5 0.5\n\n" for name in materials)
+    )
+    n_vertices = triangles_per_group + 2
+    corners = np.arange(triangles_per_group)[:, None] + np.arange(1, 4)
+    with track_mesh.open("w") as file:
+        file.write(f"mtllib {mtl_path.name}\n")
+        for i in range(n_groups):
+            group = f"group_{i}"
+            if i == 3 and track_data.vertex_groups_to_modify:
+                group = track_data.vertex_groups_to_modify[0]
+            centre = rng.uniform(-1000, 1000, 3)
+            vertices = centre + rng.uniform(-20, 20, (n_vertices, 3))
+            uvs = rng.uniform(0, 1, (n_vertices, 2))
+            faces = np.repeat(corners + i * n_vertices, 2, axis=1)
+            file.write(f"g {group}\n")
+            file.write("".join("v %.6f %.6f %.6f\n" % tuple(v) for v in vertices))
+            file.write("".join("vt %.4f %.4f\n" % tuple(uv) for uv in uvs))
+            file.write(f"usemtl {materials[i % len(materials)]}\n")
+            file.write("".join("f %d/%d %d/%d %d/%d\n" % tuple(f) for f in faces))
+
+
+def load_track_mesh(track_mesh: Path, track_name: str) -> trimesh.Scene:
+    """
+    The reference trimesh loader tracks were compiled with before the
+        vectorised OBJ loader, removing geometries specified in the track's
+        constants and vertex groups in VERTEX_GROUPS_TO_MODIFY.
+    """
+    text = override_vertex_group_materials(track_mesh.read_bytes(), track_name)
+    resolver = trimesh.resolvers.FilePathResolver(track_mesh)
+    scene = trimesh.load(io.BytesIO(text), file_type="obj", resolver=resolver)
+    scene.delete_geometry(TRACK_DATA[track_name].geometries_to_remove)
+    return scene
+
+
+def override_vertex_group_materials(text: bytes, track_name: str) -> bytes:
+    """
+    Changes the material of vertex groups in VERTEX_GROUPS_TO_MODIFY to
+        physics, which trimesh then loads as a geometry that isn't compiled.
+    """
+    text = b"\n" + text
+    view, chunks, start = memoryview(text), [], 0
+    for line, is_modifying in find_group_and_material_lines(text, track_name):
+        if is_modifying and line.group(1).startswith(b"usemtl"):
+            chunks.extend([view[start : line.start(1)], PHYSICS_MATERIAL_LINE])
+            start = line.end()
+    chunks.append(view[start:])
+    return b"".join(chunks)
+
+
+def convert_scene_to_track_bundle(scene: trimesh.Scene, track_name: str):
+    """
+    Concatenates the geometry nodes of a trimesh scene, in the same order as
+        trimesh.Scene.triangles, into a TrackBundle.
+    """
+    geometries = {}
+    for node_name in scene.graph.nodes_geometry:
+        transform, geometry_name = scene.graph[node_name]
+        geometry = scene.geometry[geometry_name]
+        if not hasattr(geometry, "triangles"):
+            continue
+        vertices = trimesh.transform_points(geometry.vertices, transform)
+        geometries[node_name] = (vertices, geometry.faces)
+    return convert_geometries_to_track_bundle(geometries, track_name)
+
+
+def time_loader(loader, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        bundle = loader()
+        timings.append(time.perf_counter() - start)
+    return min(timings), bundle
+
+
+def check_bundles_match(reference, candidate):
+    assert reference.node_names == candidate.node_names, "Node names differ"
+    assert np.array_equal(
+        reference.triangle_to_node, candidate.triangle_to_node
+    ), "Triangle to node maps differ"
+    assert np.array_equal(
+        reference.node_to_semantic_id, candidate.node_to_semantic_id
+    ), "Node semantic ids differ"
+    assert np.array_equal(
+        reference.vertices[reference.faces], candidate.vertices[candidate.faces]
+    ), "Triangles differ"
+
+
+def main():
+    args = parse_arguments()
+    with tempfile.TemporaryDirectory() as folder:
+        track_mesh = Path(folder).joinpath("track.obj")
+        write_synthetic_track(
+            track_mesh,
+            args.track_name,
+            args.n_groups,
+            args.triangles_per_group,
+        )
+        size = track_mesh.stat().st_size / 2**20
+        trimesh_time, reference = time_loader(
+            lambda: convert_scene_to_track_bundle(
+                load_track_mesh(track_mesh, args.track_name), args.track_name
+            ),
+            args.repeats,
+        )
+        fast_time, candidate = time_loader(
+            lambda: compile_track_bundle(track_mesh, args.track_name),
+            args.repeats,
+        )
+    check_bundles_match(reference, candidate)
+    table = PrettyTable(["Loader", "Seconds", "Triangles"])
+    table.add_row(["trimesh", f"{trimesh_time:.3f}", reference.n_triangles])
+    table.add_row(["acdg", f"{fast_time:.3f}", candidate.n_triangles])
+    print(f"Synthetic track: {size:.1f} MB, triangle ordering identical")
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+from pathlib import Path
+import time
+
+from acdg.mesh import get_default_bundle_path, load_track_bundle, maybe_compile_track
+from acdg.utils.load import load_game_state, load_yaml
+from acdg.utils.records import get_sample_list
+from acdg.workers.ray_caster.utils import (
+    calculate_hit_distances,
+    calculate_horizontal_fov,
+    create_camera_rays,
+    create_collision_mesh,
+    get_camera_location,
+    get_camera_rotation,
+)
+import numpy as np
+from prettytable import PrettyTable
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("config", type=str, help="Path to a configuration file")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--n-threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--n-frames", type=int, default=32)
+    return parser.parse_args()
+
+
+def load_camera_poses(config: dict, n_frames: int) -> list:
+    """
+    Loads the camera rotation and location of the first n_frames records,
+        repeating records if the recording is shorter.
+    """
+    recording_path = Path(config["recorded_data_path"])
+    records = get_sample_list(recording_path)
+    poses = []
+    for i in range(n_frames):
+        state_path = recording_path.joinpath(records[i % len(records)] + ".bin")
+        state = load_game_state(state_path)
+        rotation = get_camera_rotation(state, config["car_name"])
+        location = get_camera_location(state, config["car_name"])
+        poses.append((rotation.T.astype(np.float32), location))
+    return poses
+
+
+def intersect(mesh, origins, directions, thread_pool, n_threads: int):
+    """
+    Gets the first triangle each ray hits, splitting the rays into a chunk
+        per thread as the ray casting worker does.
+    """
+    starts = np.linspace(0, len(origins), n_threads + 1).astype(int)
+    chunks = zip(starts[:-1], starts[1:])
+    results = thread_pool.map(
+        lambda x: mesh.intersects_first(origins[x[0] : x[1]], directions[x[0] : x[1]]),
+        chunks,
+    )
+    return np.concatenate(list(results))
+
+
+def cast_frames(mesh, track, camera_directions, poses, batch_size, n_threads, depth):
+    """
+    Casts the rays of every pose, batch_size frames at a time split between
+        n_threads threads.
+    """
+    thread_pool = ThreadPoolExecutor(max_workers=n_threads)
+    for i in range(0, len(poses), batch_size):
+        directions = [camera_directions @ r for r, _ in poses[i : i + batch_size]]
+        origins = [
+            np.broadcast_to(location, d.shape)
+            for d, (_, location) in zip(directions, poses[i : i + batch_size])
+        ]
+        origins, directions = np.concatenate(origins), np.concatenate(directions)
+        i_triangles = intersect(mesh, origins, directions, thread_pool, n_threads)
+        if depth:
+            calculate_hit_distances(origins, directions, i_triangles, track)
+    thread_pool.shutdown()
+
+
+def main():
+    args = parse_arguments()
+    config = load_yaml(args.config)
+    track_mesh_path = Path(config["track_mesh_path"])
+    bundle_path = config.get("compiled_track_path")
+    if bundle_path is None:
+        bundle_path = get_default_bundle_path(track_mesh_path)
+    maybe_compile_track(track_mesh_path, config["track_name"], Path(bundle_path))
+    track = load_track_bundle(Path(bundle_path))
+    mesh = create_collision_mesh(track.vertices, track.faces)
+    width, height = config["image_size"]
+    v_fov = config["vertical_fov"]
+    fov = (calculate_horizontal_fov(v_fov, width, height), v_fov)
+    camera_directions = create_camera_rays(config["image_size"], fov)
+    poses = load_camera_poses(config, args.n_frames)
+    depth = "depth" in config["generate"]
+    table = PrettyTable(["Batch size", "Threads", "Frames per second", "Speed up"])
+    baseline = None
+    for batch_size in args.batch_sizes:
+        for n_threads in args.n_threads:
+            start = time.perf_counter()
+            cast_frames(
+                mesh, track, camera_directions, poses, batch_size, n_threads, depth
+            )
+            fps = len(poses) / (time.perf_counter() - start)
+            baseline = baseline or fps
+            row = [batch_size, n_threads, f"{fps:.2f}", f"{fps / baseline:.2f}x"]
+            table.add_row(row)
+    print(f"{width}x{height} rays, {track.n_triangles} triangles, depth: {depth}")
+    print(f"{os.cpu_count()} CPUs")
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import time
+
+from acdg.tracks.constants import COLOUR_LIST, TRAIN_ID_LIST
+from acdg.workers.generator.segmentation import (
+    create_triangle_to_colour_map,
+    create_triangle_to_train_id_map,
+)
+import numpy as np
+from prettytable import PrettyTable
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image-size", type=int, nargs=2, default=[1600, 900])
+    parser.add_argument("--n-triangles", type=int, default=2_000_000)
+    parser.add_argument("--miss-rate", type=float, default=0.2)
+    parser.add_argument("--run-length", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=20)
+    return parser.parse_args()
+
+
+def semantic_id_remap(i_triangles, triangle_to_semantic_id, image_size):
+    """
+    The per frame work segmentation did before lookup tables, remapping
+        triangle indexes to semantic ids then to train ids and colours.
+    """
+    i_tri = np.copy(i_triangles)
+    i_tri[i_tri != -1] = triangle_to_semantic_id[i_tri[i_tri != -1]]
+    pixel_ids = i_tri.reshape(image_size[::-1])
+    id_map = np.array(TRAIN_ID_LIST[pixel_ids], dtype=np.uint8)
+    colour_map = np.array(COLOUR_LIST[pixel_ids], dtype=np.uint8)[:, :, ::-1]
+    return id_map, colour_map
+
+
+def lookup_table_gather(i_triangles, triangle_to_train_id, triangle_to_colour, size):
+    """
+    The per frame work segmentation does with per triangle lookup tables.
+    """
+    i_triangles = i_triangles.reshape(size[::-1])
+    colour_map = np.take(triangle_to_colour, i_triangles, axis=0)
+    return triangle_to_train_id[i_triangles], colour_map
+
+
+def time_per_frame(method, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        outputs = method()
+    return (time.perf_counter() - start) / repeats * 1000, outputs
+
+
+def main():
+    args = parse_arguments()
+    rng = np.random.default_rng(0)
+    n_pixels = args.image_size[0] * args.image_size[1]
+    triangle_to_semantic_id = rng.integers(0, 9, args.n_triangles, dtype=np.uint8)
+    n_runs = -(-n_pixels // args.run_length)
+    i_triangles = rng.integers(0, args.n_triangles, n_runs, dtype=np.int32)
+    i_triangles = np.repeat(i_triangles, args.run_length)[:n_pixels]
+    i_triangles[rng.random(n_pixels) < args.miss_rate] = -1
+    start = time.perf_counter()
+    triangle_to_train_id = create_triangle_to_train_id_map(triangle_to_semantic_id)
+    triangle_to_colour = create_triangle_to_colour_map(triangle_to_semantic_id)
+    setup_time = (time.perf_counter() - start) * 1000
+    remap_time, expected = time_per_frame(
+        lambda: semantic_id_remap(
+            i_triangles, triangle_to_semantic_id, args.image_size
+        ),
+        args.repeats,
+    )
+    lut_time, outputs = time_per_frame(
+        lambda: lookup_table_gather(
+            i_triangles, triangle_to_train_id, triangle_to_colour, args.image_size
+        ),
+        args.repeats,
+    )
+    for expected_map, output_map in zip(expected, outputs):
+        assert np.array_equal(expected_map, output_map), "Outputs differ"
+    table = PrettyTable(["Method", "ms per frame"])
+    table.add_row(["semantic id remap", f"{remap_time:.2f}"])
+    table.add_row(["lookup tables", f"{lut_time:.2f}"])
+    width, height = args.image_size
+    print(f"{width}x{height}, {args.n_triangles} triangles, outputs identical")
+    print(f"Lookup tables built once in {setup_time:.2f} ms")
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
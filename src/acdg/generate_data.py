@@ -1,12 +1,20 @@
 import ctypes
 import multiprocessing as mp
 from pathlib import Path
+import queue
 import time
 from typing import List
 
+from acdg.mesh import (
+    get_default_bundle_path,
+    load_track_bundle,
+    maybe_compile_track,
+    share_track_bundle,
+)
 from acdg.utils.load import load_yaml
 from acdg.utils.records import get_sample_list
 from acdg.utils.save import maybe_create_folders
+from acdg.utils.shared_memory import release_shared_memory
 from acdg.workers import (
     BaseWorker,
     DataGenerationWorker,
@@ -14,11 +22,20 @@ from acdg.workers import (
     SharedState,
     WorkerSharedState,
 )
+from acdg.workers.frames import create_frame_slots
+from acdg.workers.generator.codecs import check_output_codec, create_output_codec
+from acdg.workers.generator.depth import MAX_UINT16_DEPTH
+from acdg.workers.generator.frame_modes import FRAME_MODES
+from acdg.workers.generator.outputs import OUTPUT_FORMATS, create_memmap_store
+from acdg.workers.generator.segmentation import OVERLAY_DECODE_FLAGS
+from acdg.workers.generator.worker import get_generated_outputs
 from halo import Halo
 from loguru import logger
 from prettytable import PrettyTable
 from tqdm import tqdm
 
+WORKER_EXIT_TIMEOUT = 5.0
+
 
 class MultiprocessDataGenerator:
     def __init__(self, configuration_path: str):
@@ -40,6 +57,22 @@ class MultiprocessDataGenerator:
     def recording_path(self) -> Path:
         return Path(self._config["recorded_data_path"])
 
+    @property
+    def track_mesh_path(self) -> Path:
+        return Path(self._config["track_mesh_path"])
+
+    @property
+    def compiled_track_path(self) -> Path:
+        if "compiled_track_path" in self._config:
+            return Path(self._config["compiled_track_path"])
+        return get_default_bundle_path(self.track_mesh_path)
+
+    @property
+    def n_frame_slots(self) -> int:
+        if "n_frame_slots" in self._config:
+            return self._config["n_frame_slots"]
+        return 2 * self.n_generation_workers + self.n_ray_casting_workers
+
     @property
     def workers(self) -> List[BaseWorker]:
         return [*self._ray_casting_workers, *self._generation_workers]
@@ -54,13 +87,16 @@ class MultiprocessDataGenerator:
                 - Visualised normal map of the scene
                 - Visualised depth map of the scene
             A copy of the original frame captured is made to the output folder
-            to be used as input in training datasets.
+            to be used as input in training datasets. Workers are stopped and
+            shared memory is released even if the run fails.
         """
-        self._start_worker_processes()
-        self._wait_until_workers_are_initialised()
-        self._monitor_progress()
-        self._wait_until_workers_are_done()
-        self._clean_up()
+        try:
+            self._start_worker_processes()
+            self._wait_until_workers_are_initialised()
+            self._monitor_progress()
+            self._wait_until_workers_are_done()
+        finally:
+            self._clean_up()
         self._log_success()
 
     def _populate_ray_cast_queue(self):
@@ -73,6 +109,7 @@ class MultiprocessDataGenerator:
     def _wait_until_workers_are_initialised(self):
         with Halo(text="Waiting until workers are ready...", spinner="line"):
             while not self._is_worker_pool_ready():
+                self._check_workers_are_alive()
                 time.sleep(0.1)
         logger.success("Workers initialised")
 
@@ -82,6 +119,7 @@ class MultiprocessDataGenerator:
     def _monitor_progress(self):
         self._start_progress_bar()
         while not self._shared.ray_cast_queue.empty():
+            self._check_workers_are_alive()
             self._update_progress_bar()
             time.sleep(0.2)
 
@@ -100,6 +138,7 @@ class MultiprocessDataGenerator:
     def _wait_until_ray_casters_are_done(self):
         with Halo(text="Waiting until ray casters finish...", spinner="line"):
             while not self._is_ray_casting_done():
+                self._check_workers_are_alive()
                 time.sleep(0.1)
         self._shared.is_ray_casting_done.value = True
 
@@ -110,23 +149,48 @@ class MultiprocessDataGenerator:
     def _wait_until_generators_are_done(self):
         with Halo(text="Waiting until generators finish...", spinner="line"):
             while not self._is_generation_done():
+                self._check_workers_are_alive()
                 time.sleep(0.1)
 
     def _is_generation_done(self) -> bool:
         workers = self._generation_workers
         return all([worker.is_done for worker in workers])
 
+    def _check_workers_are_alive(self):
+        crashed = [worker for worker in self.workers if self._has_crashed(worker)]
+        if crashed:
+            self._abort(crashed)
+
+    def _has_crashed(self, worker: BaseWorker) -> bool:
+        return worker.exitcode is not None and not worker.is_done
+
+    def _abort(self, crashed: List[BaseWorker]):
+        self._shared.is_aborted.value = True
+        [worker.join(WORKER_EXIT_TIMEOUT) for worker in self.workers]
+        names = ", ".join(f"{worker.name} ({worker.exitcode})" for worker in crashed)
+        raise RuntimeError(f"Worker(s) exited unexpectedly, aborting: {names}")
+
     def _clean_up(self):
         self._finalise_progress_bar()
         self._terminate_workers()
+        self._release_track()
+        self._release_frame_slots()
 
     def _finalise_progress_bar(self):
+        if self._pbar is None:
+            return
         self._update_progress_bar()
         self._pbar.close()
 
     def _terminate_workers(self):
         [worker.terminate() for worker in self.workers]
 
+    def _release_track(self):
+        [release_shared_memory(block) for block in self._track_memory]
+
+    def _release_frame_slots(self):
+        [release_shared_memory(block) for block in self._frame_memory]
+
     def _log_success(self):
         elapsed = time.time() - self._start_time
         elapsed = time.strftime("%H:%M:%S", time.gmtime(elapsed))
@@ -137,10 +201,14 @@ class MultiprocessDataGenerator:
         self._load_config(configuration_path)
         self._setup_folders()
         self._initialise_member_variables()
-        self._initialise_shared_state()
         self._log_configuration()
+        self._validate_outputs()
+        self._setup_track()
+        self._setup_frame_slots()
+        self._initialise_shared_state()
         self._setup_workers()
         self._setup_work()
+        self._maybe_create_memmap_store()
 
     def _load_config(self, configuration_path: str):
         self._config = load_yaml(configuration_path)
@@ -162,10 +230,64 @@ class MultiprocessDataGenerator:
             to_generate = ", ".join(self._config["generate"][data_type])
             table.add_row([data_type, to_generate])
 
+    def _validate_outputs(self):
+        output_format = self._config.get("output_format", "files")
+        if output_format not in OUTPUT_FORMATS:
+            formats = list(OUTPUT_FORMATS)
+            raise ValueError(f"Unknown output format {output_format}, use {formats}")
+        frame_mode = self._config.get("frame_mode", "copy")
+        if frame_mode not in FRAME_MODES:
+            modes = list(FRAME_MODES)
+            raise ValueError(f"Unknown frame mode {frame_mode}, use {modes}")
+        outputs = get_generated_outputs(self._config)
+        for output_name, settings in self._config.get("output_codecs", {}).items():
+            codec = create_output_codec(settings)
+            if output_name in outputs:
+                check_output_codec(codec, output_name, *outputs[output_name])
+        self._validate_overlays(output_format)
+        self._validate_depth_data()
+
+    def _validate_overlays(self, output_format: str):
+        overlay_scale = self._config.get("overlay_scale", 1)
+        if overlay_scale not in OVERLAY_DECODE_FLAGS:
+            scales = list(OVERLAY_DECODE_FLAGS)
+            raise ValueError(f"Unsupported overlay scale {overlay_scale}, use {scales}")
+        if self._config.get("overlay_every", 1) < 1:
+            raise ValueError("overlay_every must be at least 1")
+        is_overlaying = "overlays" in self._config["generate"].get("segmentation", [])
+        if is_overlaying and output_format == "memmap" and overlay_scale != 1:
+            raise ValueError("Memory mapped outputs require an overlay_scale of 1")
+
+    def _validate_depth_data(self):
+        if "data" not in self._config["generate"].get("depth", []):
+            return
+        if self._config.get("depth_data_format", "uint16") != "uint16":
+            return
+        max_range = self._config.get("depth_data_max_range", MAX_UINT16_DEPTH)
+        if max_range > MAX_UINT16_DEPTH:
+            raise ValueError(
+                f"depth_data_max_range of {max_range} m is beyond the"
+                f" {MAX_UINT16_DEPTH} m uint16 depth data can store, set"
+                " depth_data_format to float16 for longer ranges"
+            )
+
     def _setup_work(self):
         self._records = self._get_records_to_be_processed()
         [self._shared.ray_cast_queue.put(record) for record in self._records]
 
+    def _maybe_create_memmap_store(self):
+        if self._config.get("output_format", "files") != "memmap":
+            return
+        create_memmap_store(
+            self.output_path,
+            self._records,
+            get_generated_outputs(self._config),
+            self._config["image_size"],
+        )
+        logger.info(
+            f"Preallocated memory mapped outputs for {len(self._records)} records"
+        )
+
     def _get_records_to_be_processed(self):
         return self._get_subsample()
 
@@ -176,12 +298,36 @@ class MultiprocessDataGenerator:
         samples = get_sample_list(self.recording_path)
         return samples[start:end:interval]
 
+    def _setup_track(self):
+        maybe_compile_track(
+            self.track_mesh_path,
+            self._config["track_name"],
+            self.compiled_track_path,
+        )
+        self._share_track()
+
+    def _share_track(self):
+        track = load_track_bundle(self.compiled_track_path)
+        self._track_memory, self._shared_track = share_track_bundle(track)
+        logger.info(f"Shared {track.n_triangles} triangles with workers")
+
+    def _setup_frame_slots(self):
+        width, height = self._config["image_size"]
+        is_generating_depth = "depth" in self._config["generate"]
+        self._frame_memory, self._frame_slots = create_frame_slots(
+            self.n_frame_slots,
+            width * height,
+            is_generating_depth,
+        )
+        logger.info(f"Created {self.n_frame_slots} frame slots")
+
     def _setup_folders(self):
         maybe_create_folders(self.output_path)
 
     def _initialise_member_variables(self):
         self.is_ready = False
         self._last_n_complete = 0
+        self._pbar = None
 
     def _initialise_shared_state(self):
         self._shared = SharedState(
@@ -189,8 +335,17 @@ class MultiprocessDataGenerator:
             generation_queue=mp.Queue(),
             n_complete=mp.Value("i", 0),
             is_ray_casting_done=mp.Value(ctypes.c_bool, False),
+            track=self._shared_track,
+            frame_slots=self._frame_slots,
+            free_frame_slots=self._create_free_frame_slots(),
+            is_aborted=mp.Value(ctypes.c_bool, False),
         )
 
+    def _create_free_frame_slots(self) -> mp.Queue:
+        free_frame_slots = mp.Queue()
+        [free_frame_slots.put(i_slot) for i_slot in range(self.n_frame_slots)]
+        return free_frame_slots
+
     def _setup_workers(self):
         self._ray_casting_workers = self._create_ray_casting_workers()
         self._generation_workers = self._create_generation_workers()
@@ -224,5 +379,101 @@ class MultiprocessDataGenerator:
             is_done=mp.Value(ctypes.c_bool, False),
             is_ready=mp.Value(ctypes.c_bool, False),
             n_complete=self._shared.n_complete,
+            track=self._shared.track,
+            frame_slots=self._shared.frame_slots,
+            free_frame_slots=self._shared.free_frame_slots,
+            is_aborted=self._shared.is_aborted,
         )
         return shared_state
+
+
+class FusedDataGenerator(MultiprocessDataGenerator):
+    """
+    Runs ray casting and every registered data generator inline in a single
+        process, one record after another, for small jobs where starting and
+        feeding worker processes costs more than it saves. Uses the same
+        workers as MultiprocessDataGenerator without starting them as
+        processes, passing work between them through in process queues so
+        nothing is serialised.
+    """
+
+    @property
+    def n_frame_slots(self) -> int:
+        return self._config.get("ray_casting_batch_size", 1)
+
+    def start(self):
+        try:
+            self._setup_workers_inline()
+            self._start_time = time.time()
+            self._start_progress_bar()
+            while not self._shared.ray_cast_queue.empty():
+                self._generate_batch()
+                self._update_progress_bar()
+            self._shared.is_ray_casting_done.value = True
+            self._teardown_workers_inline()
+        finally:
+            self._clean_up()
+        self._log_success()
+
+    def _setup_workers_inline(self):
+        [worker.setup_inline() for worker in self.workers]
+        logger.success("Workers initialised")
+
+    def _teardown_workers_inline(self):
+        [worker.teardown_inline() for worker in self.workers]
+
+    def _generate_batch(self):
+        record = self._shared.ray_cast_queue.get()
+        self._ray_caster.do_work_inline(record)
+        while not self._shared.generation_queue.empty():
+            generation_job = self._shared.generation_queue.get()
+            self._generator.do_work_inline(generation_job)
+
+    def _clean_up(self):
+        self._finalise_progress_bar()
+        self._release_track()
+        self._release_frame_slots()
+
+    def _initialise_shared_state(self):
+        self._shared = SharedState(
+            ray_cast_queue=queue.Queue(),
+            generation_queue=queue.Queue(),
+            n_complete=mp.Value("i", 0),
+            is_ray_casting_done=mp.Value(ctypes.c_bool, False),
+            track=self._shared_track,
+            frame_slots=self._frame_slots,
+            free_frame_slots=self._create_free_frame_slots(),
+            is_aborted=mp.Value(ctypes.c_bool, False),
+        )
+
+    def _create_free_frame_slots(self) -> queue.Queue:
+        free_frame_slots = queue.Queue()
+        [free_frame_slots.put(i_slot) for i_slot in range(self.n_frame_slots)]
+        return free_frame_slots
+
+    def _setup_workers(self):
+        logger.info("Creating inline ray casting and generation workers...")
+        self._ray_caster = self._create_worker(RayCastingWorker)
+        self._generator = self._create_worker(DataGenerationWorker)
+        self._ray_casting_workers = [self._ray_caster]
+        self._generation_workers = [self._generator]
+
+
+DATA_GENERATOR_PIPELINES = {
+    "multiprocess": MultiprocessDataGenerator,
+    "fused": FusedDataGenerator,
+}
+
+
+def create_data_generator(configuration_path: str) -> MultiprocessDataGenerator:
+    """
+    Creates the data generator for the pipeline selected in a configuration
+        file, multiprocess unless pipeline is set.
+
+    :param configuration_path: Path to the configuration file.
+    :type configuration_path: str
+    :return: The data generator for the configured pipeline.
+    :rtype: MultiprocessDataGenerator
+    """
+    pipeline = load_yaml(configuration_path).get("pipeline", "multiprocess")
+    return DATA_GENERATOR_PIPELINES[pipeline](configuration_path)
@@ -0,0 +1,8 @@
+from .bundle import TrackBundle, get_default_bundle_path, load_track_bundle
+from .compile import maybe_compile_track
+from .shared import (
+    SharedTrackBundle,
+    attach_track_arrays,
+    attach_track_bundle,
+    share_track_bundle,
+)
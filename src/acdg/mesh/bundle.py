@@ -0,0 +1,241 @@
+from dataclasses import asdict, dataclass
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, List
+
+from acdg.tracks import TRACK_DATA
+from acdg.utils.load import load_yaml
+import numpy as np
+import yaml
+
+BUNDLE_VERSION = 4
+BUNDLE_ARRAYS = [
+    "vertices",
+    "faces",
+    "triangle_to_node",
+    "node_to_semantic_id",
+    "triangle_to_semantic_id",
+    "triangle_to_normal",
+]
+METADATA_FILENAME = "metadata.yaml"
+HASH_CHUNK_SIZE = 2**24
+
+
+@dataclass
+class TrackBundle:
+    """
+    A compiled track mesh stored as flat arrays. Triangle indexes of the
+        concatenated faces align with the triangle indexes returned when ray
+        casting against a collision mesh made from the same vertices and faces.
+
+    :param vertices: Concatenated vertices of every geometry node (V, 3).
+    :type vertices: np.array
+    :param faces: Concatenated faces indexing into vertices (F, 3).
+    :type faces: np.array
+    :param triangle_to_node: Index of the geometry node each triangle belongs
+        to (F,).
+    :type triangle_to_node: np.array
+    :param node_to_semantic_id: Semantic id of each geometry node's material
+        (N,).
+    :type node_to_semantic_id: np.array
+    :param triangle_to_semantic_id: Semantic id of each triangle's geometry
+        node (F,).
+    :type triangle_to_semantic_id: np.array
+    :param triangle_to_normal: Surface normal of each triangle (F, 3).
+    :type triangle_to_normal: np.array
+    :param node_names: Name of each geometry node, the material it was
+        grouped by when loaded.
+    :type node_names: List[str]
+    """
+
+    vertices: np.array
+    faces: np.array
+    triangle_to_node: np.array
+    node_to_semantic_id: np.array
+    triangle_to_semantic_id: np.array
+    triangle_to_normal: np.array
+    node_names: List[str]
+
+    @property
+    def n_triangles(self) -> int:
+        """
+        Returns the number of triangles in the compiled track.
+
+        :return: The number of triangles in the compiled track.
+        :rtype: int
+        """
+        return self.faces.shape[0]
+
+
+def save_track_bundle(
+    bundle: TrackBundle,
+    bundle_path: Path,
+    track_mesh_path: Path,
+    track_name: str,
+):
+    """
+    Writes each of a compiled track's arrays to a .npy file and records the
+        key they were compiled with. The metadata is written last so a bundle
+        interrupted mid write is never considered current.
+
+    :param bundle: The compiled track to save.
+    :type bundle: TrackBundle
+    :param bundle_path: Folder to save the compiled track to.
+    :type bundle_path: Path
+    :param track_mesh_path: Path to the track mesh file it was compiled from.
+    :type track_mesh_path: Path
+    :param track_name: Name of the track.
+    :type track_name: str
+    """
+    bundle_path.mkdir(parents=True, exist_ok=True)
+    metadata_path = bundle_path.joinpath(METADATA_FILENAME)
+    metadata_path.unlink(missing_ok=True)
+    for name in BUNDLE_ARRAYS:
+        np.save(bundle_path.joinpath(f"{name}.npy"), getattr(bundle, name))
+    metadata = create_bundle_metadata(track_mesh_path, track_name)
+    metadata["node_names"] = bundle.node_names
+    with metadata_path.open("w") as file:
+        yaml.dump(metadata, file)
+
+
+def load_track_bundle(bundle_path: Path) -> TrackBundle:
+    """
+    Loads a compiled track with each of its arrays memory-mapped.
+
+    :param bundle_path: Folder the compiled track was saved to.
+    :type bundle_path: Path
+    :return: The compiled track.
+    :rtype: TrackBundle
+    """
+    metadata = load_yaml(bundle_path.joinpath(METADATA_FILENAME))
+    arrays = {
+        name: np.load(bundle_path.joinpath(f"{name}.npy"), mmap_mode="r")
+        for name in BUNDLE_ARRAYS
+    }
+    return TrackBundle(node_names=metadata["node_names"], **arrays)
+
+
+def is_track_bundle_current(
+    bundle_path: Path,
+    track_mesh_path: Path,
+    track_name: str,
+) -> bool:
+    """
+    Returns True if a compiled track exists and was compiled from the current
+        contents of the track mesh and track data. The source mesh is only
+        re-hashed when its size or modification time have changed.
+
+    :param bundle_path: Folder the compiled track was saved to.
+    :type bundle_path: Path
+    :param track_mesh_path: Path to the track mesh file.
+    :type track_mesh_path: Path
+    :param track_name: Name of the track.
+    :type track_name: str
+    :return: True if the compiled track is current, False otherwise.
+    :rtype: bool
+    """
+    metadata_path = bundle_path.joinpath(METADATA_FILENAME)
+    if not metadata_path.is_file():
+        return False
+    metadata = load_yaml(metadata_path)
+    if not is_bundle_key_current(metadata, track_name):
+        return False
+    if metadata["source_stat"] == get_file_stat(track_mesh_path):
+        return True
+    return metadata["source_hash"] == hash_file(track_mesh_path)
+
+
+def is_bundle_key_current(metadata: Dict, track_name: str) -> bool:
+    """
+    Returns True if a compiled track's metadata matches the current bundle
+        version and track data.
+
+    :param metadata: Metadata saved alongside the compiled track.
+    :type metadata: Dict
+    :param track_name: Name of the track.
+    :type track_name: str
+    :return: True if the version and track data match, False otherwise.
+    :rtype: bool
+    """
+    return (
+        metadata.get("version") == BUNDLE_VERSION
+        and metadata.get("track_name") == track_name
+        and metadata.get("track_data_hash") == hash_track_data(track_name)
+    )
+
+
+def create_bundle_metadata(track_mesh_path: Path, track_name: str) -> Dict:
+    """
+    Creates the metadata used to key a compiled track.
+
+    :param track_mesh_path: Path to the track mesh file.
+    :type track_mesh_path: Path
+    :param track_name: Name of the track.
+    :type track_name: str
+    :return: The compiled track's metadata.
+    :rtype: Dict
+    """
+    return {
+        "version": BUNDLE_VERSION,
+        "track_name": track_name,
+        "track_data_hash": hash_track_data(track_name),
+        "source_hash": hash_file(track_mesh_path),
+        "source_stat": get_file_stat(track_mesh_path),
+    }
+
+
+def hash_file(filepath: Path) -> str:
+    """
+    Returns the sha256 hash of a file's contents.
+
+    :param filepath: Path to the file to hash.
+    :type filepath: Path
+    :return: Hex digest of the file's contents.
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with filepath.open("rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_track_data(track_name: str) -> str:
+    """
+    Returns the sha256 hash of a track's entry in TRACK_DATA.
+
+    :param track_name: Name of the track.
+    :type track_name: str
+    :return: Hex digest of the track's data.
+    :rtype: str
+    """
+    track_data = asdict(TRACK_DATA[track_name])
+    serialised = yaml.dump(track_data, sort_keys=True)
+    return hashlib.sha256(serialised.encode("utf-8")).hexdigest()
+
+
+def get_file_stat(filepath: Path) -> List[int]:
+    """
+    Returns the size and modification time of a file in nanoseconds.
+
+    :param filepath: Path to the file.
+    :type filepath: Path
+    :return: The file's size and modification time.
+    :rtype: List[int]
+    """
+    stat = os.stat(filepath)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def get_default_bundle_path(track_mesh_path: Path) -> Path:
+    """
+    Returns the folder a track is compiled to when no compiled_track_path is
+        configured.
+
+    :param track_mesh_path: Path to the track mesh file.
+    :type track_mesh_path: Path
+    :return: Folder the compiled track is saved to.
+    :rtype: Path
+    """
+    return track_mesh_path.parent.joinpath(f"{track_mesh_path.stem}-compiled")
@@ -0,0 +1,134 @@
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from acdg.mesh.bundle import (
+    TrackBundle,
+    get_default_bundle_path,
+    is_track_bundle_current,
+    save_track_bundle,
+)
+from acdg.mesh.obj import load_track_geometries
+from acdg.tracks import TRACK_DATA
+from loguru import logger
+import numpy as np
+import trimesh
+
+
+def maybe_compile_track(
+    track_mesh_path: Path,
+    track_name: str,
+    bundle_path: Path = None,
+    force: bool = False,
+):
+    """
+    Compiles a track mesh to a TrackBundle and saves it, unless a current
+        compiled track already exists.
+
+    :param track_mesh_path: Path to the track mesh file.
+    :type track_mesh_path: Path
+    :param track_name: Name of the track.
+    :type track_name: str
+    :param bundle_path: Folder to save the compiled track to, defaults to a
+        folder next to the track mesh.
+    :type bundle_path: Path
+    :param force: Recompile even if the compiled track is current.
+    :type force: bool
+    """
+    if bundle_path is None:
+        bundle_path = get_default_bundle_path(track_mesh_path)
+    if not force and is_track_bundle_current(bundle_path, track_mesh_path, track_name):
+        logger.info(f"Compiled track is up to date: {bundle_path}")
+        return
+    logger.info(f"Compiling {track_mesh_path} to {bundle_path}...")
+    bundle = compile_track_bundle(track_mesh_path, track_name)
+    save_track_bundle(bundle, bundle_path, track_mesh_path, track_name)
+    logger.success(f"Compiled {bundle.n_triangles} triangles")
+
+
+def compile_track_bundle(track_mesh_path: Path, track_name: str) -> TrackBundle:
+    """
+    Loads and filters a track mesh then flattens it into a TrackBundle.
+
+    :param track_mesh_path: Path to the track mesh file.
+    :type track_mesh_path: Path
+    :param track_name: Name of the track.
+    :type track_name: str
+    :return: The compiled track.
+    :rtype: TrackBundle
+    """
+    geometries = load_track_geometries(track_mesh_path, track_name)
+    return convert_geometries_to_track_bundle(geometries, track_name)
+
+
+def convert_geometries_to_track_bundle(
+    geometries: Dict[str, Tuple[np.array, np.array]],
+    track_name: str,
+) -> TrackBundle:
+    """
+    Concatenates the vertices and faces of each geometry, in order, into a
+        TrackBundle.
+
+    :param geometries: Vertices and faces of each geometry keyed by the name
+        of the material it uses.
+    :type geometries: Dict[str, Tuple[np.array, np.array]]
+    :param track_name: Name of the track.
+    :type track_name: str
+    :return: The compiled track.
+    :rtype: TrackBundle
+    """
+    vertices, faces, normals, n_node_triangles = [], [], [], []
+    n_vertices = 0
+    for geometry_vertices, geometry_faces in geometries.values():
+        vertices.append(geometry_vertices)
+        faces.append(geometry_faces + n_vertices)
+        normals.append(get_face_normals(geometry_vertices, geometry_faces))
+        n_node_triangles.append(len(geometry_faces))
+        n_vertices += len(geometry_vertices)
+    node_names = list(geometries.keys())
+    node_to_semantic_id = get_node_to_semantic_id_map(node_names, track_name)
+    triangle_to_node = np.arange(len(node_names), dtype=np.int32)
+    return TrackBundle(
+        vertices=np.concatenate(vertices),
+        faces=np.concatenate(faces),
+        triangle_to_node=np.repeat(triangle_to_node, n_node_triangles),
+        node_to_semantic_id=node_to_semantic_id,
+        triangle_to_semantic_id=np.repeat(node_to_semantic_id, n_node_triangles),
+        triangle_to_normal=np.concatenate(normals),
+        node_names=node_names,
+    )
+
+
+def get_node_to_semantic_id_map(node_names: List[str], track_name: str) -> np.array:
+    """
+    Returns the semantic id of each geometry node's material. Looked up once
+        per node, the per triangle map is then expanded from it with the number
+        of triangles in each node.
+
+    :param node_names: Name of each geometry node, the material it uses.
+    :type node_names: List[str]
+    :param track_name: Name of the track.
+    :type track_name: str
+    :return: Geometry node index to semantic class id map.
+    :rtype: np.array
+    """
+    material_to_id = TRACK_DATA[track_name].material_to_id
+    node_to_semantic_id = [material_to_id[name] for name in node_names]
+    return np.asarray(node_to_semantic_id, dtype=np.uint8)
+
+
+def get_face_normals(vertices: np.array, faces: np.array) -> np.array:
+    """
+    Returns the unit normal of each face of a geometry, degenerate faces are
+        given a normal of zeros.
+
+    :param vertices: Vertices of the geometry (V, 3).
+    :type vertices: np.array
+    :param faces: Faces of the geometry indexing into vertices (F, 3).
+    :type faces: np.array
+    :return: Surface normal of each face (F, 3).
+    :rtype: np.array
+    """
+    normals, valid = trimesh.triangles.normals(vertices[faces])
+    face_normals = np.zeros((len(faces), 3), dtype=np.float32)
+    face_normals[valid] = normals
+    return face_normals
@@ -0,0 +1,52 @@
+import re
+from typing import Iterator, Optional, Tuple
+
+from acdg.tracks import TRACK_DATA
+
+GROUP_OR_MATERIAL_LINE = re.compile(rb"\n((?:g|usemtl) [^\n]*)")
+
+
+def find_group_and_material_lines(
+    text: bytes,
+    track_name: str,
+) -> Iterator[Tuple[re.Match, bool]]:
+    """
+    Yields each group and material line of an OBJ file along with whether it
+        is inside a vertex group specified in VERTEX_GROUPS_TO_MODIFY. Lines
+        are found by searching for newlines, so the first line of the file is
+        only found if the text starts with a newline.
+
+    :param text: Contents of the track mesh file.
+    :type text: bytes
+    :param track_name: Name of the track.
+    :type track_name: str
+    :return: Each line's match, the line itself is the match's first group,
+        and whether it is inside a vertex group to modify.
+    :rtype: Iterator[Tuple[re.Match, bool]]
+    """
+    matcher = compile_vertex_group_matcher(track_name)
+    is_modifying = False
+    for line in GROUP_OR_MATERIAL_LINE.finditer(text):
+        content = line.group(1)
+        if content.startswith(b"g ") and not content.startswith(b"g off"):
+            is_modifying = False
+        if matcher is not None and matcher.search(content):
+            is_modifying = True
+        yield line, is_modifying
+
+
+def compile_vertex_group_matcher(track_name: str) -> Optional[re.Pattern]:
+    """
+    Returns a pattern matching any of the vertex group names specified in the
+        track specific configuration data, or None if there are none.
+
+    :param track_name: Name of the track.
+    :type track_name: str
+    :return: Pattern matching any of the vertex group names to modify.
+    :rtype: Optional[re.Pattern]
+    """
+    vertex_groups_to_modify = TRACK_DATA[track_name].vertex_groups_to_modify
+    if not vertex_groups_to_modify:
+        return None
+    names = [re.escape(name.encode("utf-8")) for name in vertex_groups_to_modify]
+    return re.compile(b"|".join(names))
@@ -0,0 +1,247 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+import re
+from typing import Dict, List, Optional, Tuple
+
+from acdg.mesh.load import find_group_and_material_lines
+from acdg.tracks import TRACK_DATA
+import numpy as np
+
+VERTEX_PREFIX = b"\nv "
+FACE_PREFIX = b"\nf "
+PHYSICS_MATERIAL = "physics"
+
+
+@dataclass
+class ObjSegment:
+    """
+    A span of an OBJ file between two group or material directives.
+
+    :param start: Index of the newline the segment starts at.
+    :type start: int
+    :param end: Index of the newline the next segment starts at.
+    :type end: int
+    :param material: Material applied to faces in the segment, after vertex
+        group overrides.
+    :type material: Optional[str]
+    """
+
+    start: int
+    end: int
+    material: Optional[str]
+
+
+def load_track_geometries(
+    track_mesh: Path,
+    track_name: str,
+) -> Dict[str, Tuple[np.array, np.array]]:
+    """
+    Loads the geometries of a track exported from the game as an OBJ file of
+        g, usemtl, v and f records. Faces are grouped by material, with vertex
+        groups in VERTEX_GROUPS_TO_MODIFY using the physics material, and any
+        material in GEOMETRIES_TO_REMOVE is skipped before its faces are
+        parsed. Vertices are only parsed for the blocks kept faces reference.
+        Geometries and triangles are ordered the same as trimesh.load.
+
+    :param track_mesh: Path to the track mesh file.
+    :type track_mesh: Path
+    :param track_name: Name of the track.
+    :type track_name: str
+    :return: Vertices and faces of each geometry keyed by material name.
+    :rtype: Dict[str, Tuple[np.array, np.array]]
+    """
+    text = b"\n" + track_mesh.read_bytes()
+    segments = split_obj_into_segments(text, track_name)
+    material_to_faces = parse_kept_faces(text, segments, track_name)
+    if None in material_to_faces:
+        material_to_faces[track_mesh.name] = material_to_faces.pop(None)
+    # trimesh.load adds geometries in the reverse order materials first appear
+    geometry_faces = [
+        (material, np.concatenate(faces))
+        for material, faces in reversed(material_to_faces.items())
+    ]
+    i_vertices = [np.unique(faces) for _, faces in geometry_faces]
+    i_needed = np.unique(np.concatenate(i_vertices))
+    needed_vertices = parse_needed_vertices(text, segments, i_needed)
+    geometries = {}
+    for (material, faces), i_geometry in zip(geometry_faces, i_vertices):
+        vertices = needed_vertices[np.searchsorted(i_needed, i_geometry)]
+        faces = np.searchsorted(i_geometry, faces)
+        geometries[material] = (vertices, faces)
+    return geometries
+
+
+def split_obj_into_segments(text: bytes, track_name: str) -> List[ObjSegment]:
+    """
+    Splits an OBJ file at each group and material directive, tracking the
+        material applied to each segment's faces. Materials of vertex groups
+        in VERTEX_GROUPS_TO_MODIFY are overridden with physics.
+
+    :param text: Contents of the track mesh file, starting with a newline.
+    :type text: bytes
+    :param track_name: Name of the track.
+    :type track_name: str
+    :return: Segments of the file in order.
+    :rtype: List[ObjSegment]
+    """
+    segments = [ObjSegment(0, len(text), None)]
+    material = None
+    for line, is_modifying in find_group_and_material_lines(text, track_name):
+        content = line.group(1)
+        if content.startswith(b"usemtl"):
+            material = content[len(b"usemtl") :].strip().decode("utf-8")
+            if is_modifying:
+                material = PHYSICS_MATERIAL
+        segments[-1].end = line.start()
+        segments.append(ObjSegment(line.start(), len(text), material))
+    return segments
+
+
+def parse_kept_faces(
+    text: bytes,
+    segments: List[ObjSegment],
+    track_name: str,
+) -> Dict[Optional[str], List[np.array]]:
+    """
+    Parses the faces of each segment whose material is not removed, grouping
+        them by material in the order materials first appear.
+
+    :param text: Contents of the track mesh file, starting with a newline.
+    :type text: bytes
+    :param segments: Segments of the file in order.
+    :type segments: List[ObjSegment]
+    :param track_name: Name of the track.
+    :type track_name: str
+    :return: Zero based faces indexing the file's vertices, per material.
+    :rtype: Dict[Optional[str], List[np.array]]
+    """
+    geometries_to_remove = set(TRACK_DATA[track_name].geometries_to_remove)
+    material_to_faces = defaultdict(list)
+    for segment in segments:
+        if segment.material in geometries_to_remove:
+            continue
+        faces = parse_faces(text, segment.start, segment.end)
+        if faces is not None:
+            material_to_faces[segment.material].append(faces)
+    return material_to_faces
+
+
+def parse_needed_vertices(
+    text: bytes,
+    segments: List[ObjSegment],
+    i_needed: np.array,
+) -> np.array:
+    """
+    Parses only the vertex blocks containing vertices referenced by kept
+        faces, returning the vertices in the order of i_needed.
+
+    :param text: Contents of the track mesh file, starting with a newline.
+    :type text: bytes
+    :param segments: Segments of the file in order.
+    :type segments: List[ObjSegment]
+    :param i_needed: Sorted indexes of the vertices referenced by kept faces.
+    :type i_needed: np.array
+    :return: Vertices referenced by kept faces.
+    :rtype: np.array
+    """
+    vertices, i_first = [], 0
+    for segment in segments:
+        n_vertices = text.count(VERTEX_PREFIX, segment.start, segment.end)
+        if n_vertices == 0:
+            continue
+        i_range = i_first, i_first + n_vertices
+        low, high = np.searchsorted(i_needed, i_range)
+        if low < high:
+            block = parse_vertices(text, segment.start, segment.end)
+            vertices.append(block[i_needed[low:high] - i_first])
+        i_first += n_vertices
+    return np.concatenate(vertices)
+
+
+def parse_vertices(text: bytes, start: int, end: int) -> np.array:
+    """
+    Parses the vertex positions of a segment of an OBJ file.
+
+    :param text: Contents of the track mesh file, starting with a newline.
+    :type text: bytes
+    :param start: Index the segment starts at.
+    :type start: int
+    :param end: Index the segment ends at.
+    :type end: int
+    :return: Vertex positions (n, 3).
+    :rtype: np.array
+    """
+    data, columns = extract_records(text, start, end, VERTEX_PREFIX)
+    values = np.fromstring(data, dtype=np.float64, sep=" ")
+    return values.reshape((-1, columns))[:, :3]
+
+
+def parse_faces(text: bytes, start: int, end: int) -> Optional[np.array]:
+    """
+    Parses the faces of a segment of an OBJ file, discarding any texture or
+        normal indexes.
+
+    :param text: Contents of the track mesh file, starting with a newline.
+    :type text: bytes
+    :param start: Index the segment starts at.
+    :type start: int
+    :param end: Index the segment ends at.
+    :type end: int
+    :raises ValueError: If faces are not triangles or use relative indexes.
+    :return: Zero based faces (n, 3), or None if the segment has no faces.
+    :rtype: Optional[np.array]
+    """
+    if text.find(FACE_PREFIX, start, end) < 0:
+        return None
+    data, corners = extract_records(text, start, end, FACE_PREFIX)
+    if corners != 3:
+        raise ValueError(
+            f"Only triangular faces are supported, got {corners} corners,"
+            " export the mesh with Triangulate Faces enabled"
+        )
+    first_corner = data[: data.find(b" ", 1)].strip()
+    per_corner = len([index for index in first_corner.split(b"/") if index])
+    values = np.fromstring(data.replace(b"/", b" "), dtype=np.int64, sep=" ")
+    faces = values.reshape((-1, corners * per_corner))[:, ::per_corner]
+    if faces.min() < 1:
+        raise ValueError(
+            "Only positive face indexes are supported, export the mesh with"
+            " absolute indexes"
+        )
+    return faces - 1
+
+
+def extract_records(
+    text: bytes,
+    start: int,
+    end: int,
+    prefix: bytes,
+) -> Tuple[bytes, int]:
+    """
+    Extracts the values of every record with a given prefix in a segment as
+        a single newline separated block. Contiguous records, the usual layout
+        of exported tracks, are extracted without splitting lines.
+
+    :param text: Contents of the track mesh file, starting with a newline.
+    :type text: bytes
+    :param start: Index the segment starts at.
+    :type start: int
+    :param end: Index the segment ends at.
+    :type end: int
+    :param prefix: Record prefix including the leading newline.
+    :type prefix: bytes
+    :return: Values of each record and the number of values in the first.
+    :rtype: Tuple[bytes, int]
+    """
+    first = text.find(prefix, start, end)
+    last = text.rfind(prefix, start, end)
+    stop = text.find(b"\n", last + 1, end)
+    block = text[first : end if stop < 0 else stop]
+    if block.count(b"\n") != block.count(prefix):
+        pattern = re.escape(prefix) + rb"[^\n]*"
+        block = b"".join(re.findall(pattern, block))
+    data = block.replace(prefix, b"\n")
+    first_end = data.find(b"\n", 1)
+    columns = len(data[1 : len(data) if first_end < 0 else first_end].split())
+    return data, columns
@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+
+from acdg.mesh.bundle import BUNDLE_ARRAYS, TrackBundle
+from acdg.utils.shared_memory import (
+    SharedArray,
+    attach_shared_array,
+    create_shared_array,
+)
+import numpy as np
+
+
+@dataclass
+class SharedTrackBundle:
+    """
+    A picklable description of a TrackBundle published to shared memory.
+
+    :param arrays: Description of each of the compiled track's arrays in
+        shared memory, keyed by array name.
+    :type arrays: Dict[str, SharedArray]
+    :param node_names: Name of each geometry node.
+    :type node_names: List[str]
+    """
+
+    arrays: Dict[str, SharedArray]
+    node_names: List[str]
+
+
+def share_track_bundle(
+    bundle: TrackBundle,
+) -> Tuple[List[SharedMemory], SharedTrackBundle]:
+    """
+    Copies each of a compiled track's arrays into its own shared memory block.
+        The caller owns the blocks and is responsible for releasing them.
+
+    :param bundle: The compiled track to share.
+    :type bundle: TrackBundle
+    :return: The shared memory blocks and a description of the shared track.
+    :rtype: Tuple[List[SharedMemory], SharedTrackBundle]
+    """
+    shared_memory, arrays = [], {}
+    for name in BUNDLE_ARRAYS:
+        block, arrays[name] = create_shared_array(getattr(bundle, name))
+        shared_memory.append(block)
+    return shared_memory, SharedTrackBundle(arrays, bundle.node_names)
+
+
+def attach_track_bundle(
+    shared_bundle: SharedTrackBundle,
+) -> Tuple[List[SharedMemory], TrackBundle]:
+    """
+    Attaches to a compiled track in shared memory without copying it. The
+        shared memory blocks must be kept referenced for as long as the track
+        is in use.
+
+    :param shared_bundle: A description of the shared track.
+    :type shared_bundle: SharedTrackBundle
+    :return: The shared memory blocks and the compiled track viewing them.
+    :rtype: Tuple[List[SharedMemory], TrackBundle]
+    """
+    names = list(shared_bundle.arrays.keys())
+    shared_memory, arrays = attach_track_arrays(shared_bundle, names)
+    bundle = TrackBundle(node_names=shared_bundle.node_names, **arrays)
+    return shared_memory, bundle
+
+
+def attach_track_arrays(
+    shared_bundle: SharedTrackBundle,
+    names: List[str],
+) -> Tuple[List[SharedMemory], Dict[str, np.array]]:
+    """
+    Attaches to only some of a compiled track's arrays in shared memory
+        without copying them, for processes that only need per triangle
+        lookup tables. The shared memory blocks must be kept referenced for as
+        long as the arrays are in use.
+
+    :param shared_bundle: A description of the shared track.
+    :type shared_bundle: SharedTrackBundle
+    :param names: Names of the arrays to attach to.
+    :type names: List[str]
+    :return: The shared memory blocks and each array viewing them, keyed by
+        array name.
+    :rtype: Tuple[List[SharedMemory], Dict[str, np.array]]
+    """
+    shared_memory, arrays = [], {}
+    for name in names:
+        block, arrays[name] = attach_shared_array(shared_bundle.arrays[name])
+        shared_memory.append(block)
+    return shared_memory, arrays
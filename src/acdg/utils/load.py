@@ -48,14 +48,17 @@ def state_bytes_to_dict(data: bytes) -> Dict:
     return state_dict
 
 
-def load_image(filepath: Union[Path, str]) -> np.array:
+def load_image(filepath: Union[Path, str], flags: int = cv2.IMREAD_COLOR) -> np.array:
     """
     Loads an image from file.
     :param filepath: Path to image file to be loaded.
     :type filepath: Union[Path,str]
+    :param flags: OpenCV imread flags, such as cv2.IMREAD_REDUCED_COLOR_2 to
+        decode a JPEG at half its size.
+    :type flags: int
     :return: Image loaded as a numpy array.
     :rtype: np.array
     """
     if isinstance(filepath, Path):
         filepath = str(filepath)
-    return cv2.imread(filepath)
+    return cv2.imread(filepath, flags)
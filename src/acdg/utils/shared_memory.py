@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Tuple
+
+import numpy as np
+
+
+@dataclass
+class SharedArray:
+    """
+    A picklable description of a numpy array stored in a shared memory block.
+
+    :param name: Name of the shared memory block.
+    :type name: str
+    :param shape: Shape of the array.
+    :type shape: Tuple[int]
+    :param dtype: Data type of the array.
+    :type dtype: str
+    """
+
+    name: str
+    shape: Tuple[int]
+    dtype: str
+
+
+def allocate_shared_array(
+    shape: Tuple[int],
+    dtype: np.dtype,
+) -> Tuple[SharedMemory, SharedArray]:
+    """
+    Allocates a new shared memory block large enough for an array of a given
+        shape and data type. The caller owns the block and is responsible for
+        closing and unlinking it.
+
+    :param shape: Shape of the array.
+    :type shape: Tuple[int]
+    :param dtype: Data type of the array.
+    :type dtype: np.dtype
+    :return: The shared memory block and a description of the array in it.
+    :rtype: Tuple[SharedMemory, SharedArray]
+    """
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    shared_memory = SharedMemory(create=True, size=max(nbytes, 1))
+    return shared_memory, SharedArray(shared_memory.name, tuple(shape), dtype.str)
+
+
+def create_shared_array(array: np.array) -> Tuple[SharedMemory, SharedArray]:
+    """
+    Copies an array into a new shared memory block. The caller owns the block
+        and is responsible for closing and unlinking it.
+
+    :param array: The array to copy into shared memory.
+    :type array: np.array
+    :return: The shared memory block and a description of the array in it.
+    :rtype: Tuple[SharedMemory, SharedArray]
+    """
+    shared_memory, descriptor = allocate_shared_array(array.shape, array.dtype)
+    shared_array = np.ndarray(array.shape, array.dtype, buffer=shared_memory.buf)
+    shared_array[...] = array
+    return shared_memory, descriptor
+
+
+def attach_shared_array(descriptor: SharedArray) -> Tuple[SharedMemory, np.array]:
+    """
+    Attaches to an array in an existing shared memory block without copying
+        it. The shared memory block must be kept referenced for as long as the
+        array is in use.
+
+    :param descriptor: A description of the array in shared memory.
+    :type descriptor: SharedArray
+    :return: The shared memory block and an array viewing it.
+    :rtype: Tuple[SharedMemory, np.array]
+    """
+    shared_memory = SharedMemory(name=descriptor.name)
+    dtype = np.dtype(descriptor.dtype)
+    array = np.ndarray(descriptor.shape, dtype, buffer=shared_memory.buf)
+    return shared_memory, array
+
+
+def release_shared_memory(shared_memory: SharedMemory):
+    """
+    Closes and unlinks a shared memory block created by this process.
+
+    :param shared_memory: The shared memory block to release.
+    :type shared_memory: SharedMemory
+    """
+    shared_memory.close()
+    shared_memory.unlink()
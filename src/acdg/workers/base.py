@@ -5,7 +5,8 @@ from pathlib import Path
 import queue
 from typing import Dict, List
 
-from acdg.workers.utils import load_track_mesh
+from acdg.mesh import SharedTrackBundle, attach_track_arrays, attach_track_bundle
+from acdg.workers.frames import SharedFrameSlots, attach_frame_slots
 
 QUEUE_TIMEOUT = 0.5
 
@@ -28,12 +29,29 @@ class SharedState:
     :param n_complete: The mp Value representing the number of tasks completed
         globally, across all workers.
     :type n_complete: mp.Value
+    :param track: The compiled track published to shared memory by the
+        MultiprocessDataGenerator.
+    :type track: SharedTrackBundle
+    :param frame_slots: The pool of shared memory frame slots ray casting
+        results are passed to the data generation workers through.
+    :type frame_slots: SharedFrameSlots
+    :param free_frame_slots: The mp queue containing the index of each frame
+        slot that is free to be written to.
+    :type free_frame_slots: mp.Queue
+    :param is_aborted: The mp Value indicating whether the run has been
+        aborted, such as when a worker exits unexpectedly, and workers should
+        stop without finishing their work.
+    :type is_aborted: mp.Value
     """
 
     ray_cast_queue: mp.Queue
     generation_queue: mp.Queue
     is_ray_casting_done: mp.Value
     n_complete: mp.Value
+    track: SharedTrackBundle
+    frame_slots: SharedFrameSlots
+    free_frame_slots: mp.Queue
+    is_aborted: mp.Value
 
 
 @dataclass
@@ -74,14 +92,41 @@ class BaseWorker(mp.Process):
     def run(self):
         """
         The main function that is called when a worker is started. The process
-            receives work from a shared mp queue and completes it.
+            receives work from a shared mp queue and completes it, until all
+            work is complete or the run is aborted.
         """
         self._setup()
         self.is_running = True
-        while self.is_running:
+        while self.is_running and not self.is_aborted:
             self._maybe_do_work()
+        self._teardown()
         self.set_as_done()
 
+    def setup_inline(self):
+        """
+        Runs the worker's setup steps in the calling process, for running the
+            worker's work inline instead of starting it as a process.
+        """
+        self._setup()
+
+    def teardown_inline(self):
+        """
+        Runs the worker's teardown steps in the calling process, once all of
+            the work run inline is complete.
+        """
+        self._teardown()
+
+    def do_work_inline(self, work):
+        """
+        Completes a single piece of work in the calling process.
+
+        :param work: The work to complete, as it would be received from the
+            job queue.
+        :type work: Any
+        """
+        self._work = work
+        self._do_work()
+
     def _maybe_do_work(self):
         """
         Check if there's work available and if there is do it.
@@ -123,6 +168,12 @@ class BaseWorker(mp.Process):
         """
         raise NotImplementedError()
 
+    def _teardown(self):
+        """
+        Specific steps to run once the worker has finished all of its work,
+            before it is set as done. Does nothing unless overridden.
+        """
+
     @abc.abstractproperty
     def _job_queue(self) -> mp.Queue:
         """
@@ -166,6 +217,16 @@ class BaseWorker(mp.Process):
         """
         return self._shared_state.is_done.value
 
+    @property
+    def is_aborted(self) -> bool:
+        """
+        Returns True if the run has been aborted, otherwise False.
+
+        :return: True if the run has been aborted, otherwise False.
+        :rtype: bool
+        """
+        return self._shared_state.is_aborted.value
+
     @property
     def is_ray_casting_done(self) -> bool:
         """
@@ -210,23 +271,24 @@ class BaseWorker(mp.Process):
         return self._shared_state.generation_queue
 
     @property
-    def track_mesh_path(self) -> Path:
+    def free_frame_slots(self) -> mp.Queue:
         """
-        Returns a Path to the track mesh file.
+        Returns the shared multiprocessing Queue of free frame slot indexes.
 
-        :return: The Path to the track mesh file.
-        :rtype: Path
+        :return: The multiprocessing Queue of free frame slot indexes.
+        :rtype: mp.Queue
         """
-        return Path(self._config["track_mesh_path"])
+        return self._shared_state.free_frame_slots
 
     @property
-    def modified_mesh_path(self) -> Path:
-        """Returns a Path to the modified track mesh file.
+    def track_mesh_path(self) -> Path:
+        """
+        Returns a Path to the track mesh file.
 
-        :return: The Path to the modified track mesh file.
+        :return: The Path to the track mesh file.
         :rtype: Path
         """
-        return self.track_mesh_path.parent / "tmp.obj"
+        return Path(self._config["track_mesh_path"])
 
     @property
     def recording_path(self) -> Path:
@@ -298,12 +360,29 @@ class BaseWorker(mp.Process):
         """
         self._shared_state.is_done.value = True
 
-    def _setup_scene(self):
+    def _setup_track(self):
         """
-        Loads a modified track mesh.
+        Attaches to the compiled track mesh in shared memory.
         """
-        self._scene = load_track_mesh(
-            self.track_mesh_path,
-            self.modified_mesh_path,
-            self.track_name,
+        shared_track = self._shared_state.track
+        self._track_memory, self._track = attach_track_bundle(shared_track)
+
+    def _setup_track_arrays(self, names: List[str]):
+        """
+        Attaches to only some of the compiled track's arrays in shared memory.
+
+        :param names: Names of the compiled track's arrays to attach to.
+        :type names: List[str]
+        """
+        shared_track = self._shared_state.track
+        self._track_memory, self._track_arrays = attach_track_arrays(
+            shared_track,
+            names,
         )
+
+    def _setup_frame_slots(self):
+        """
+        Attaches to the pool of frame slots in shared memory.
+        """
+        shared_slots = self._shared_state.frame_slots
+        self._frame_memory, self._frame_slots = attach_frame_slots(shared_slots)
@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+
+from acdg.utils.shared_memory import (
+    SharedArray,
+    allocate_shared_array,
+    attach_shared_array,
+)
+import numpy as np
+
+FRAME_SCHEMA_VERSION = 3
+FRAME_ARRAYS = {
+    "i_triangles": np.int32,
+    "distances": np.float32,
+}
+
+
+@dataclass
+class SharedFrameSlots:
+    """
+    A picklable description of a fixed pool of frame slots in shared memory.
+        Ray casters write the results for a record into a free slot and only
+        send the slot's index to the generation workers, which read the slot
+        in place and then return it to the pool of free slots. Only values
+        that cannot be derived from the camera model or compiled track are
+        stored, triangle indexes use -1 for a miss.
+
+    :param arrays: Description of each per ray array in shared memory, keyed by
+        array name, each with one row per slot.
+    :type arrays: Dict[str, SharedArray]
+    """
+
+    arrays: Dict[str, SharedArray]
+
+
+def create_frame_slots(
+    n_slots: int,
+    n_rays: int,
+    is_generating_depth: bool,
+) -> Tuple[List[SharedMemory], SharedFrameSlots]:
+    """
+    Allocates a shared memory block for each per ray array with a row for
+        each frame slot. Distances are only allocated when generating depth.
+        The caller owns the blocks and is responsible for releasing them.
+
+    :param n_slots: Number of frame slots.
+    :type n_slots: int
+    :param n_rays: Number of rays cast for each frame.
+    :type n_rays: int
+    :param is_generating_depth: Whether depth maps are being generated.
+    :type is_generating_depth: bool
+    :return: The shared memory blocks and a description of the frame slots.
+    :rtype: Tuple[List[SharedMemory], SharedFrameSlots]
+    """
+    shared_memory, arrays = [], {}
+    for name, dtype in FRAME_ARRAYS.items():
+        if name == "distances" and not is_generating_depth:
+            continue
+        block, arrays[name] = allocate_shared_array((n_slots, n_rays), dtype)
+        shared_memory.append(block)
+    return shared_memory, SharedFrameSlots(arrays)
+
+
+def attach_frame_slots(
+    shared_slots: SharedFrameSlots,
+) -> Tuple[List[SharedMemory], Dict[str, np.array]]:
+    """
+    Attaches to the frame slots in shared memory without copying them. The
+        shared memory blocks must be kept referenced for as long as the slots
+        are in use.
+
+    :param shared_slots: A description of the frame slots.
+    :type shared_slots: SharedFrameSlots
+    :return: The shared memory blocks and each per ray array viewing them,
+        indexed by slot then ray.
+    :rtype: Tuple[List[SharedMemory], Dict[str, np.array]]
+    """
+    shared_memory, arrays = [], {}
+    for name, descriptor in shared_slots.arrays.items():
+        block, arrays[name] = attach_shared_array(descriptor)
+        shared_memory.append(block)
+    return shared_memory, arrays
@@ -1,8 +1,7 @@
 import abc
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
-from acdg.workers.generator.utils import save_image
 import numpy as np
 
 
@@ -14,17 +13,38 @@ class DataGenerator:
     :param worker_reference: A reference to the worker that will be used for generating data.
     :type worker_reference: Any
 
+    :cvar outputs: The outputs saved by each generation method that can be
+        configured, by output name, with their number of channels, 0 for a
+        single channel, and data type. See get_outputs for outputs that
+        depend on the configuration.
+    :vartype outputs: Dict[str, Dict[str, Tuple[int, type]]]
     :ivar _worker: A reference to the worker that will be used for generating data.
     :vartype _worker: Any
     :ivar _generation_methods: A list of functions that will be used to generate the data.
     :vartype _generation_methods: List[Callable]
     """
 
+    outputs: Dict[str, Dict[str, Tuple[int, type]]] = {}
+
     def __init__(self, worker_reference):
         self._worker = worker_reference
         self._generation_methods = []
         self._setup()
 
+    @classmethod
+    def get_outputs(cls, configuration: Dict) -> Dict[str, Dict[str, Tuple[int, type]]]:
+        """
+        Returns the outputs saved by each generation method for a
+            configuration.
+
+        :param configuration: The workers' configuration.
+        :type configuration: Dict
+        :return: The outputs of each generation method, by output name, with
+            their number of channels and data type.
+        :rtype: Dict[str, Dict[str, Tuple[int, type]]]
+        """
+        return cls.outputs
+
     @abc.abstractmethod
     def generate(self):
         """
@@ -43,29 +63,18 @@ class DataGenerator:
         """
         raise NotImplementedError()
 
-    def _save_data(self, filename: str, to_save: np.array):
+    def _save_data(self, output_name: str, to_save: np.array):
         """
-        Saves the generated data to a file.
+        Queues the generated data to be encoded with the output's configured
+            codec and saved by the worker's output. The data must not be
+            modified afterwards.
 
-        :param filename: The name of the file to save the data as.
-        :type filename: str
+        :param output_name: The name of the output.
+        :type output_name: str
         :param to_save: The data that will be saved.
         :type to_save: numpy.array
         """
-        flip_ud = not self._is_generating_depth
-        output_path = self._output_path.joinpath(filename)
-        save_image(to_save, output_path, flip_ud)
-
-    def _insert_values_into_image(self, values: np.array, image: np.array):
-        """
-        Inserts values into an image.
-
-        :param values: The values to be inserted into the image.
-        :type values: numpy.array
-        :param image: The image where the values will be inserted.
-        :type image: numpy.array
-        """
-        image[self._pixels_to_rays[:, 0], self._pixels_to_rays[:, 1]] = values
+        self._worker.output.save(output_name, to_save)
 
     @property
     def _generation_job(self) -> Dict:
@@ -125,63 +134,38 @@ class DataGenerator:
         :return: Triangle indexes for the current generation job.
         :rtype: numpy.array
         """
-        return self._worker._work["i_triangles"]
+        return self._worker._frame["i_triangles"]
 
     @property
-    def _pixels_to_rays(self) -> np.array:
+    def _hit_mask(self) -> np.array:
         """
-        The pixels to rays mapping for the current generation job.
+        Whether the ray cast through each pixel hit a triangle, in height by
+            width order.
 
-        :return: The pixels to rays mapping for the current generation job.
+        :return: Whether the ray cast through each pixel hit a triangle.
         :rtype: np.array
         """
-        return self._worker._work["pixels_to_rays"]
+        return (self._i_triangles != -1).reshape(self._image_shape)
 
     @property
-    def _hit_to_camera(self) -> np.array:
+    def _distances(self) -> np.array:
         """
-        Returns a vector from the camera origin to each ray's hit location.
+        Distance along the ray cast through each pixel to where it hit a
+            triangle, infinite if it missed, in height by width order.
 
-        :return: A vector from the camera origin to each ray's hit location.
+        :return: Distance along each pixel's ray to its hit.
         :rtype: np.array
         """
-        locations = self._worker._work["locations"]
-        origin = self._worker._work["origin"]
-        return locations - origin
+        return self._worker._frame["distances"].reshape(self._image_shape)
 
     @property
-    def _ray_directions(self) -> np.array:
+    def _image_shape(self) -> Tuple[int, int]:
         """
-        Returns unit vectors in the direction of each of the camera's pixel
-            rays.
+        Returns the shape of an image, its size in pixels in height by width
+            order, the layout per pixel ray casting results are in.
 
-        :return: unit vectors in the direction of each of the camera's pixel
-            rays.
-        :rtype: np.array
+        :return: The image size in pixels in height by width order.
+        :rtype: Tuple[int, int]
         """
-        directions = self._worker._work["ray_directions"]
-        i_ray = self._worker._work["i_rays"]
-        return directions[i_ray]
-
-    @property
-    def _is_generating_depth(self) -> bool:
-        """
-        Returns True if depth maps are being generated for the samples.
-
-        :return: True if depth maps are being generated for the samples,
-            otherwise False.
-        :rtype: bool
-        """
-        generation_config = self._worker._config["generate"]
-        return "depth" in generation_config
-
-    @property
-    def _image_size(self) -> List[int]:
-        """
-        Returns the image size in pixels and width by hight order.
-
-        :return: the image size in pixels and width by hight order.
-        :rtype: List[int]
-        """
-
-        return self._worker._config["image_size"]
+        width, height = self._worker._config["image_size"]
+        return height, width
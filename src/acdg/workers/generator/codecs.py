@@ -0,0 +1,279 @@
+import io
+from typing import Dict, Optional
+import zlib
+
+import cv2
+import numpy as np
+
+
+class OutputCodec:
+    """
+    Base class for deriving classes that encode generated outputs to bytes
+        before they are written to file.
+
+    :ivar extension: File extension of outputs encoded by the codec.
+    :vartype extension: str
+    :ivar dtypes: Data types the codec can encode, any if None.
+    :vartype dtypes: Tuple[type], optional
+    :ivar channels: Numbers of channels the codec can encode, 0 for a single
+        channel, any if None.
+    :vartype channels: Tuple[int], optional
+    """
+
+    extension = ""
+    dtypes = None
+    channels = None
+
+    def encode(self, to_save: np.array) -> bytes:
+        """
+        Encode an output to bytes.
+
+        :param to_save: The output to encode.
+        :type to_save: np.array
+        :raises NotImplementedError: This method needs to be implemented by the derived class.
+        :return: The encoded output.
+        :rtype: bytes
+        """
+        raise NotImplementedError()
+
+    def decode(self, encoded: bytes) -> np.array:
+        """
+        Decode an output encoded by the codec.
+
+        :param encoded: The encoded output.
+        :type encoded: bytes
+        :raises NotImplementedError: This method needs to be implemented by the derived class.
+        :return: The decoded output.
+        :rtype: np.array
+        """
+        raise NotImplementedError()
+
+
+class ImageCodec(OutputCodec):
+    """
+    Encodes outputs as images with OpenCV.
+    """
+
+    channels = (0, 3, 4)
+
+    def _encode_image(self, to_save: np.array, parameters: list) -> bytes:
+        """
+        Encode an output as an image of the codec's format.
+
+        :param to_save: The output to encode.
+        :type to_save: np.array
+        :param parameters: OpenCV image encoding parameters.
+        :type parameters: list
+        :raises ValueError: If OpenCV fails to encode the output.
+        :return: The encoded output.
+        :rtype: bytes
+        """
+        is_success, encoded = cv2.imencode(self.extension, to_save, parameters)
+        if not is_success:
+            raise ValueError(f"Failed to encode output as {self.extension}")
+        return encoded.tobytes()
+
+    def decode(self, encoded: bytes) -> np.array:
+        encoded = np.frombuffer(encoded, dtype=np.uint8)
+        return cv2.imdecode(encoded, cv2.IMREAD_UNCHANGED)
+
+
+class PNGCodec(ImageCodec):
+    """
+    Encodes outputs as PNG images.
+
+    :param compression: zlib compression level between 0 and 9, higher is
+        smaller and slower. OpenCV's default is used if not set.
+    :type compression: int, optional
+    """
+
+    extension = ".png"
+    dtypes = (np.uint8, np.uint16)
+
+    def __init__(self, compression: Optional[int] = None):
+        self._parameters = []
+        if compression is not None:
+            self._parameters = [cv2.IMWRITE_PNG_COMPRESSION, compression]
+
+    def encode(self, to_save: np.array) -> bytes:
+        return self._encode_image(to_save, self._parameters)
+
+
+class WebPCodec(ImageCodec):
+    """
+    Encodes outputs as lossless WebP images. Single channel outputs are
+        decoded with three identical channels.
+    """
+
+    extension = ".webp"
+    dtypes = (np.uint8,)
+
+    def encode(self, to_save: np.array) -> bytes:
+        return self._encode_image(to_save, [cv2.IMWRITE_WEBP_QUALITY, 101])
+
+
+class NPYCodec(OutputCodec):
+    """
+    Encodes outputs as uncompressed NumPy .npy files, keeping their shape and
+        data type.
+    """
+
+    extension = ".npy"
+
+    def encode(self, to_save: np.array) -> bytes:
+        buffer = io.BytesIO()
+        np.save(buffer, to_save, allow_pickle=False)
+        return buffer.getvalue()
+
+    def decode(self, encoded: bytes) -> np.array:
+        return np.load(io.BytesIO(encoded), allow_pickle=False)
+
+
+class ZlibCodec(NPYCodec):
+    """
+    Encodes outputs as zlib compressed NumPy .npy files.
+
+    :param level: zlib compression level between 0 and 9, higher is smaller
+        and slower.
+    :type level: int
+    """
+
+    extension = ".npy.zlib"
+
+    def __init__(self, level: int = 6):
+        self._level = level
+
+    def encode(self, to_save: np.array) -> bytes:
+        return zlib.compress(super().encode(to_save), self._level)
+
+    def decode(self, encoded: bytes) -> np.array:
+        return super().decode(zlib.decompress(encoded))
+
+
+class LZ4Codec(NPYCodec):
+    """
+    Encodes outputs as LZ4 frame compressed NumPy .npy files, trading a larger
+        file for much faster encoding than zlib. Requires the lz4 package.
+
+    :param level: LZ4 compression level, 0 is fastest and up to 16 is smaller
+        and slower.
+    :type level: int
+    """
+
+    extension = ".npy.lz4"
+
+    def __init__(self, level: int = 0):
+        self._level = level
+        self._lz4_frame = import_lz4_frame()
+
+    def encode(self, to_save: np.array) -> bytes:
+        encoded = super().encode(to_save)
+        return self._lz4_frame.compress(encoded, compression_level=self._level)
+
+    def decode(self, encoded: bytes) -> np.array:
+        return super().decode(self._lz4_frame.decompress(encoded))
+
+
+OUTPUT_CODECS = {
+    "png": PNGCodec,
+    "webp": WebPCodec,
+    "npy": NPYCodec,
+    "zlib": ZlibCodec,
+    "lz4": LZ4Codec,
+}
+
+
+def import_lz4_frame():
+    """
+    Imports the lz4 frame module, which is only required by the lz4 codec.
+
+    :raises ImportError: If the lz4 package is not installed.
+    :return: The lz4 frame module.
+    :rtype: module
+    """
+    try:
+        import lz4.frame
+    except ImportError as error:
+        message = "The lz4 output codec requires the lz4 package, pip install lz4"
+        raise ImportError(message) from error
+    return lz4.frame
+
+
+def get_default_codec_settings(channels: int, dtype: type) -> Dict:
+    """
+    Returns the settings of the codec used for an output with no codec
+        configured, a PNG image at OpenCV's default compression unless PNG
+        can't store the output, then a .npy file.
+
+    :param channels: The output's number of channels, 0 for a single channel.
+    :type channels: int
+    :param dtype: The output's data type.
+    :type dtype: type
+    :return: The default codec's settings.
+    :rtype: Dict
+    """
+    if is_supported_by_codec(PNGCodec, channels, dtype):
+        return {"codec": "png"}
+    return {"codec": "npy"}
+
+
+def is_supported_by_codec(codec: OutputCodec, channels: int, dtype: type) -> bool:
+    """
+    Returns True if a codec can encode outputs with a number of channels and
+        data type, otherwise False.
+
+    :param codec: The codec, or its class.
+    :type codec: OutputCodec
+    :param channels: The output's number of channels, 0 for a single channel.
+    :type channels: int
+    :param dtype: The output's data type.
+    :type dtype: type
+    :return: True if the codec can encode the output, otherwise False.
+    :rtype: bool
+    """
+    is_dtype_supported = codec.dtypes is None or np.dtype(dtype) in codec.dtypes
+    is_channels_supported = codec.channels is None or channels in codec.channels
+    return is_dtype_supported and is_channels_supported
+
+
+def check_output_codec(
+    codec: OutputCodec, output_name: str, channels: int, dtype: type
+):
+    """
+    Checks a codec can encode an output.
+
+    :param codec: The codec configured for the output.
+    :type codec: OutputCodec
+    :param output_name: The name of the output.
+    :type output_name: str
+    :param channels: The output's number of channels, 0 for a single channel.
+    :type channels: int
+    :param dtype: The output's data type.
+    :type dtype: type
+    :raises ValueError: If the codec can't encode the output.
+    """
+    if is_supported_by_codec(codec, channels, dtype):
+        return
+    name = type(codec).__name__
+    dtype = np.dtype(dtype).name
+    message = f"{name} can't encode {output_name}, {channels} channel {dtype}"
+    raise ValueError(message)
+
+
+def create_output_codec(settings: Optional[Dict] = None) -> OutputCodec:
+    """
+    Creates an output codec from its configuration settings, the name of the
+        codec under codec and any options it takes. Outputs are saved as PNG
+        images at OpenCV's default compression if no settings are given.
+
+    :param settings: The codec's name and options.
+    :type settings: Dict, optional
+    :raises ValueError: If the codec's name is not in OUTPUT_CODECS.
+    :return: The configured output codec.
+    :rtype: OutputCodec
+    """
+    settings = dict(settings or {"codec": "png"})
+    name = settings.pop("codec")
+    if name not in OUTPUT_CODECS:
+        raise ValueError(f"Unknown output codec {name}, use {list(OUTPUT_CODECS)}")
+    return OUTPUT_CODECS[name](**settings)
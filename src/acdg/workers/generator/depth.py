@@ -1,3 +1,5 @@
+from typing import Dict, Tuple
+
 from acdg.workers.generator.base import DataGenerator
 from acdg.workers.generator.utils import (
     allocate_empty_frame,
@@ -6,10 +8,37 @@ from acdg.workers.generator.utils import (
     reverse_sign_of_values,
 )
 import numpy as np
-import trimesh
+
+DEPTH_DATA_FORMATS = {"uint16": np.uint16, "float16": np.float16}
+MAX_UINT16_DEPTH = np.iinfo(np.uint16).max / 1000
 
 
 class DepthMapGenerator(DataGenerator):
+    outputs = {
+        "visuals": {"depth": (0, np.uint8)},
+        "data": {"depth_data": (0, np.uint16)},
+    }
+
+    @classmethod
+    def get_outputs(cls, configuration: Dict) -> Dict[str, Dict[str, Tuple[int, type]]]:
+        """
+        Returns the outputs saved by each generation method, raw depth data is
+            stored with the data type set by depth_data_format.
+
+        :param configuration: The workers' configuration.
+        :type configuration: Dict
+        :raises ValueError: If depth_data_format is not in DEPTH_DATA_FORMATS.
+        :return: The outputs of each generation method, by output name, with
+            their number of channels and data type.
+        :rtype: Dict[str, Dict[str, Tuple[int, type]]]
+        """
+        data_format = configuration.get("depth_data_format", "uint16")
+        if data_format not in DEPTH_DATA_FORMATS:
+            formats = list(DEPTH_DATA_FORMATS)
+            raise ValueError(f"Unknown depth data format {data_format}, use {formats}")
+        dtype = DEPTH_DATA_FORMATS[data_format]
+        return {**cls.outputs, "data": {"depth_data": (0, dtype)}}
+
     def generate(self):
         """
         Calls all methods registered in configuration to generate depth data.
@@ -30,21 +59,13 @@ class DepthMapGenerator(DataGenerator):
         :returns: Depth map
         :rtype: np.array
         """
-        depth = self._calculate_depth()
+        hit_mask = self._hit_mask
+        depth = self._distances[hit_mask]
         self._visualise_depth_map(depth)
-        depth_map = allocate_empty_frame(*self._image_size)
-        self._insert_values_into_image(depth, depth_map)
+        depth_map = allocate_empty_frame(*self._image_shape)
+        depth_map[hit_mask] = depth
         return depth_map
 
-    def _calculate_depth(self) -> np.array:
-        """
-        Returns the depth at each pixel location.
-
-        :return: Depth map.
-        :rtype: np.array
-        """
-        return calculate_depth(self._hit_to_camera, self._ray_directions)
-
     def _visualise_depth_map(self, depth: np.array):
         """
         Converts the raw depth measurement into normalised uint8 values between
@@ -57,6 +78,39 @@ class DepthMapGenerator(DataGenerator):
         reverse_sign_of_values(depth)
         convert_to_uint8(depth)
 
+    def _generate_depth_data(self):
+        """
+        Generates raw metric depth data and saves it.
+        """
+        depth_data = self._get_depth_data()
+        self._save_depth_data(depth_data)
+
+    def _get_depth_data(self) -> np.array:
+        """
+        Returns the distance in metres from the camera along each pixel's ray
+            to where it hit the track. As float16 misses are infinite. As
+            uint16 distances are in millimetres, saturating at
+            depth_data_max_range metres, and misses are 0.
+
+        :returns: Raw depth data
+        :rtype: np.array
+        """
+        if self._depth_data_dtype == np.float16:
+            return self._distances.astype(np.float16)
+        depth = np.multiply(self._distances, 1000, dtype=np.float32)
+        np.minimum(depth, self._max_depth_millimetres, out=depth)
+        depth[~self._hit_mask] = 0
+        return np.rint(depth, out=depth).astype(np.uint16)
+
+    def _save_depth_data(self, depth_data: np.array):
+        """
+        Save raw depth data.
+
+        :param depth_data: Raw depth data.
+        :type depth_data: np.array
+        """
+        self._save_data("depth_data", depth_data)
+
     def _save_depth_map(self, depth_map: np.array):
         """
         Save visualised depth map.
@@ -64,14 +118,26 @@ class DepthMapGenerator(DataGenerator):
         :param depth_map: A visualised depth map.
         :type depth_map: np.array
         """
-        self._save_data(f"{self._record_number}-depth.png", depth_map)
+        self._save_data("depth", depth_map)
 
     def _setup(self):
         """
         Specific setup steps for DepthMapGenerator.
         """
+        self._setup_depth_data_format()
         self._register_generation_methods()
 
+    def _setup_depth_data_format(self):
+        """
+        Set the data type raw depth data is stored as and the furthest
+            distance in millimetres stored as uint16, at most 65.535 metres,
+            which is checked before the workers start.
+        """
+        outputs = self.get_outputs(self._worker._config)
+        _, self._depth_data_dtype = outputs["data"]["depth_data"]
+        max_range = self._worker._config.get("depth_data_max_range", MAX_UINT16_DEPTH)
+        self._max_depth_millimetres = max_range * 1000
+
     def _register_generation_methods(self):
         """
         Registers data generation methods to call based on user configuration.
@@ -81,18 +147,5 @@ class DepthMapGenerator(DataGenerator):
             method = self._generate_visualised_depth_map
             self._generation_methods.append(method)
         if "data" in generator_config:
-            raise NotImplementedError()
-
-
-def calculate_depth(hit_to_camera: np.array, directions: np.array) -> np.array:
-    """
-    Calculates the depth from image plane pixel to ray collision.
-
-    :param hit_to_camera: Vectors from camera origin to ray collision location.
-    :type hit_to_camera: np.array
-    :param directions: Unit vectors in the direction of the camera pixel rays.
-    :type directions: np.array
-    :return: Distances from image plane pixels to collision location
-    :rtype: np.array
-    """
-    return trimesh.util.diagonal_dot(hit_to_camera, directions)
+            method = self._generate_depth_data
+            self._generation_methods.append(method)
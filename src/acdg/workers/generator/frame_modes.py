@@ -0,0 +1,106 @@
+import errno
+import os
+from pathlib import Path
+import shutil
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FICLONE = 0x40049409
+
+
+def copy_frame(source_path: Path, destination_path: Path):
+    """
+    Copies a captured frame to the output folder.
+
+    :param source_path: Path of the captured frame.
+    :type source_path: Path
+    :param destination_path: Path of the frame in the output folder.
+    :type destination_path: Path
+    """
+    shutil.copyfile(source_path, destination_path)
+
+
+def hardlink_frame(source_path: Path, destination_path: Path):
+    """
+    Hard links a captured frame into the output folder, sharing its data on
+        disk. Fails if the source and destination are on different
+        filesystems.
+
+    :param source_path: Path of the captured frame.
+    :type source_path: Path
+    :param destination_path: Path of the frame in the output folder.
+    :type destination_path: Path
+    """
+    os.link(source_path, destination_path)
+
+
+def reflink_frame(source_path: Path, destination_path: Path):
+    """
+    Clones a captured frame into the output folder with the FICLONE ioctl,
+        sharing its data on disk copy on write. Only supported on Linux
+        filesystems such as btrfs and XFS, and fails if the source and
+        destination are on different filesystems.
+
+    :param source_path: Path of the captured frame.
+    :type source_path: Path
+    :param destination_path: Path of the frame in the output folder.
+    :type destination_path: Path
+    :raises OSError: If reflinks are not supported.
+    """
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported on this platform")
+    with source_path.open("rb") as source, destination_path.open("wb") as destination:
+        fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+
+
+def symlink_frame(source_path: Path, destination_path: Path):
+    """
+    Symbolically links a captured frame into the output folder by its
+        absolute path.
+
+    :param source_path: Path of the captured frame.
+    :type source_path: Path
+    :param destination_path: Path of the frame in the output folder.
+    :type destination_path: Path
+    """
+    os.symlink(source_path.resolve(), destination_path)
+
+
+FRAME_MODES = {
+    "copy": copy_frame,
+    "hardlink": hardlink_frame,
+    "reflink": reflink_frame,
+    "symlink": symlink_frame,
+    "skip": None,
+}
+
+
+def materialise_frame(source_path: Path, destination_path: Path, mode: str) -> str:
+    """
+    Materialises a captured frame in the output folder, replacing any frame
+        left by an earlier run. Falls back to copying the frame if the mode
+        fails, such as when linking across filesystems.
+
+    :param source_path: Path of the captured frame.
+    :type source_path: Path
+    :param destination_path: Path of the frame in the output folder.
+    :type destination_path: Path
+    :param mode: How the frame is materialised, copy, hardlink, reflink or
+        symlink.
+    :type mode: str
+    :return: The mode the frame was materialised with.
+    :rtype: str
+    """
+    destination_path.unlink(missing_ok=True)
+    try:
+        FRAME_MODES[mode](source_path, destination_path)
+    except OSError:
+        if mode == "copy":
+            raise
+        destination_path.unlink(missing_ok=True)
+        copy_frame(source_path, destination_path)
+        return "copy"
+    return mode
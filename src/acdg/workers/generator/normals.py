@@ -1,14 +1,36 @@
+from typing import Dict, Tuple
+
 from acdg.workers.generator.base import DataGenerator
-from acdg.workers.generator.utils import (
-    allocate_empty_frame,
-    convert_to_uint8,
-    noramlise_values,
-)
 import numpy as np
-import trimesh
+
+NORMAL_DATA_BITS = {8: np.uint8, 16: np.uint16}
 
 
 class NormalMapGenerator(DataGenerator):
+    outputs = {
+        "visuals": {"normals": (3, np.uint8)},
+        "data": {"normals_data": (2, np.uint16)},
+    }
+
+    @classmethod
+    def get_outputs(cls, configuration: Dict) -> Dict[str, Dict[str, Tuple[int, type]]]:
+        """
+        Returns the outputs saved by each generation method, raw normal data
+            is stored with normal_data_bits bits per channel.
+
+        :param configuration: The workers' configuration.
+        :type configuration: Dict
+        :raises ValueError: If normal_data_bits is not in NORMAL_DATA_BITS.
+        :return: The outputs of each generation method, by output name, with
+            their number of channels and data type.
+        :rtype: Dict[str, Dict[str, Tuple[int, type]]]
+        """
+        n_bits = configuration.get("normal_data_bits", 16)
+        if n_bits not in NORMAL_DATA_BITS:
+            options = list(NORMAL_DATA_BITS)
+            raise ValueError(f"Unsupported normal data bits {n_bits}, use {options}")
+        return {**cls.outputs, "data": {"normals_data": (2, NORMAL_DATA_BITS[n_bits])}}
+
     def generate(self):
         """
         Calls all methods registered in configuration to generate normal data.
@@ -22,33 +44,42 @@ class NormalMapGenerator(DataGenerator):
         normal_map = self._get_normal_map()
         self._save_normal_map(normal_map)
 
-    def _get_normal_map(self):
+    def _get_normal_map(self) -> np.array:
         """
-        Generates a visualised normal map.
+        Generates a visualised normal map, pixels whose ray missed are black.
 
         :return: A visualised normal map.
         :rtype: np.array
         """
-        normals = self._triangle_to_normal[self._i_triangles]
-        self._visualise_normal_map(normals)
-        if self._is_generating_depth:
-            shape = self._image_size
-            normal_map = allocate_empty_frame(*shape, channels=3)
-            self._insert_values_into_image(normals, normal_map)
-        else:
-            normal_map = normals.reshape((*self._image_size, 3))
-        return normal_map
+        i_triangles = self._i_triangles.reshape(self._image_shape)
+        return np.take(self._triangle_to_normal_colour, i_triangles, axis=0)
 
-    def _visualise_normal_map(self, normals: np.array):
+    def _generate_normal_data(self):
+        """
+        Generates raw octahedral encoded normal data and saves it.
         """
-        Converts the raw normal vectors into normalised uint8 values between 0
-            and 255 for visualisation.
+        normal_data = self._get_normal_data()
+        self._save_normal_data(normal_data)
 
-        :param normals: A raw normal map.
-        :type normals: np.array
+    def _get_normal_data(self) -> np.array:
         """
-        noramlise_values(normals)
-        convert_to_uint8(normals)
+        Generates raw normal data, the octahedral encoding of each pixel's
+            surface normal. Pixels whose ray missed are 0.
+
+        :return: Raw normal data.
+        :rtype: np.array
+        """
+        i_triangles = self._i_triangles.reshape(self._image_shape)
+        return np.take(self._triangle_to_octahedral_normal, i_triangles, axis=0)
+
+    def _save_normal_data(self, normal_data: np.array):
+        """
+        Save raw normal data.
+
+        :param normal_data: Raw normal data.
+        :type normal_data: np.array
+        """
+        self._save_data("normals_data", normal_data)
 
     def _save_normal_map(self, normal_map: np.array):
         """
@@ -57,22 +88,38 @@ class NormalMapGenerator(DataGenerator):
         :param normal_map: A visualised normal map.
         :type normal_map: np.array
         """
-        self._save_data(f"{self._record_number}-normals.png", normal_map)
+        self._save_data("normals", normal_map)
 
     def _setup(self):
         """
         Specific setup steps for NormalMapGenerator.
         """
-        self._setup_triangle_to_normal_map()
+        self._setup_triangle_to_normal_colour_map()
+        self._setup_triangle_to_octahedral_normal_map()
         self._register_generation_methods()
 
-    def _setup_triangle_to_normal_map(self):
+    def _setup_triangle_to_normal_colour_map(self):
         """
-        Creates a mapping between triangle indexes and their respective surface
-            normal vector.
+        Creates a lookup table mapping triangle indexes to the colour of their
+            surface normal for visualisation, from the compiled track's
+            triangle to normal lookup table. It has an extra last entry for
+            pixels that missed, indexed by -1.
         """
-        triangle_to_normal = get_triangle_to_normal_map(self._worker._scene)
-        self._triangle_to_normal = triangle_to_normal
+        normals = self._worker._track_arrays["triangle_to_normal"]
+        self._triangle_to_normal_colour = create_triangle_to_normal_colour_map(normals)
+
+    def _setup_triangle_to_octahedral_normal_map(self):
+        """
+        Creates a lookup table mapping triangle indexes to the octahedral
+            encoding of their surface normal, with an extra last entry of 0
+            for pixels that missed, indexed by -1.
+        """
+        outputs = self.get_outputs(self._worker._config)
+        _, dtype = outputs["data"]["normals_data"]
+        normals = self._worker._track_arrays["triangle_to_normal"]
+        encoded = np.zeros((len(normals) + 1, 2), dtype=dtype)
+        encoded[:-1] = encode_octahedral_normals(normals, dtype)
+        self._triangle_to_octahedral_normal = encoded
 
     def _register_generation_methods(self):
         """
@@ -83,20 +130,85 @@ class NormalMapGenerator(DataGenerator):
             method = self._generate_visualised_normal_map
             self._generation_methods.append(method)
         if "data" in generator_config:
-            raise NotImplementedError()
+            method = self._generate_normal_data
+            self._generation_methods.append(method)
+
+
+def create_triangle_to_normal_colour_map(triangle_to_normal: np.array) -> np.array:
+    """
+    Returns a mapping between triangle indexes and the colour of their surface
+        normal, each component mapped from [-1, 1] to [0, 255], with a last
+        black entry for rays that missed. The mapping is fixed so a surface
+        has the same colour in every frame.
+
+    :param triangle_to_normal: Triangle index to surface normal map (F, 3).
+    :type triangle_to_normal: np.array
+    :return: Triangle index to normal colour map (F + 1, 3).
+    :rtype: np.array
+    """
+    colours = np.zeros((len(triangle_to_normal) + 1, 3), dtype=np.uint8)
+    normals = np.clip(triangle_to_normal, -1.0, 1.0)
+    colours[:-1] = np.rint((normals + 1.0) * 127.5)
+    return colours
+
+
+def encode_octahedral_normals(normals: np.array, dtype: type) -> np.array:
+    """
+    Encodes unit normals as two unsigned integer channels by projecting them
+        onto an octahedron and unfolding it into a square. Valid normals are
+        quantised to values from 1 up to the data type's maximum so that 0
+        is free to mark zero normals, which are encoded as 0.
+
+    :param normals: Unit normals (..., 3).
+    :type normals: np.array
+    :param dtype: Unsigned integer data type to encode to, uint8 or uint16.
+    :type dtype: type
+    :return: Octahedral encoded normals (..., 2).
+    :rtype: np.array
+    """
+    normals = np.asarray(normals, dtype=np.float32)
+    l1_norm = np.abs(normals).sum(axis=-1, keepdims=True)
+    is_valid = l1_norm[..., 0] > 0
+    projected = normals[..., :2] / np.where(l1_norm > 0, l1_norm, 1)
+    is_lower = normals[..., 2] < 0
+    folded = (1 - np.abs(projected[..., ::-1])) * sign_not_zero(projected)
+    projected[is_lower] = folded[is_lower]
+    max_value = np.iinfo(dtype).max
+    encoded = np.rint((projected + 1) / 2 * (max_value - 1)) + 1
+    encoded[~is_valid] = 0
+    return encoded.astype(dtype)
+
+
+def decode_octahedral_normals(encoded: np.array) -> np.array:
+    """
+    Decodes octahedral encoded normals, as saved by the normal data output,
+        back to unit normals. Pixels encoded as 0, whose ray missed, are
+        decoded to zero normals.
+
+    :param encoded: Octahedral encoded normals (..., 2), uint8 or uint16.
+    :type encoded: np.array
+    :return: Unit normals (..., 3).
+    :rtype: np.array
+    """
+    max_value = np.iinfo(encoded.dtype).max
+    is_valid = np.all(encoded > 0, axis=-1)
+    projected = (encoded.astype(np.float32) - 1) / (max_value - 1) * 2 - 1
+    z = 1 - np.abs(projected).sum(axis=-1)
+    fold = np.clip(-z, 0, None)[..., None]
+    xy = projected - fold * sign_not_zero(projected)
+    normals = np.concatenate([xy, z[..., None]], axis=-1)
+    normals /= np.linalg.norm(normals, axis=-1, keepdims=True)
+    normals[~is_valid] = 0
+    return normals
 
 
-def get_triangle_to_normal_map(scene: trimesh.Scene) -> np.array:
+def sign_not_zero(values: np.array) -> np.array:
     """
-    Returns a mapping between triangle indexes and surface normal vectors of
-        a triangle's face.
+    Returns the sign of each value, treating 0 as positive.
 
-    :param scene: The trimesh.Scene object for the track
-    :type scene: trimesh.Scene
-    :return: Triangle index to surface normal vector map
+    :param values: Values to get the sign of.
+    :type values: np.array
+    :return: 1 for values of 0 or more, otherwise -1.
     :rtype: np.array
     """
-    normals, valid = trimesh.triangles.normals(scene.triangles)
-    triangle_to_normal = np.zeros((valid.shape[0], 3), dtype=np.float32)
-    triangle_to_normal[valid] = normals
-    return triangle_to_normal
+    return np.where(values >= 0, 1.0, -1.0).astype(np.float32)
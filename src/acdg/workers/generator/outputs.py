@@ -0,0 +1,401 @@
+from concurrent.futures import Future
+import csv
+import io
+from pathlib import Path
+import tarfile
+import threading
+from typing import Dict, List, Tuple
+
+from acdg.workers.generator.frame_modes import materialise_frame
+from acdg.workers.generator.utils import save_image
+from loguru import logger
+import numpy as np
+
+INDEX_COLUMNS = ["record_number", "shard", "member", "offset", "size"]
+MANIFEST_COLUMNS = ["record_number", "source_path"]
+MEMMAP_INDEX_FILENAME = "records.csv"
+
+
+class FileOutput:
+    """
+    Saves each of a sample's outputs to its own file in the output folder,
+        named by record number and output name, alongside the captured
+        frame. Frames are copied, hard linked, reflinked or symlinked into
+        the output folder depending on frame_mode, or with skip left in place
+        and listed with their source path in a manifest per worker.
+
+    :param worker_reference: A reference to the worker whose outputs are saved.
+    :type worker_reference: DataGenerationWorker
+    """
+
+    def __init__(self, worker_reference):
+        self._worker = worker_reference
+        self._is_fallback_logged = False
+        self._manifest_file = None
+        if self._frame_mode == "skip":
+            self._open_manifest()
+
+    def save(self, output_name: str, to_save: np.array):
+        """
+        Queues an output of the current sample to be encoded and saved to file
+            by the worker's background writer.
+
+        :param output_name: The name of the output, the file's suffix.
+        :type output_name: str
+        :param to_save: The output to save.
+        :type to_save: np.array
+        """
+        codec = self._worker.get_output_codec(output_name)
+        filename = f"{self._record_number}-{output_name}{codec.extension}"
+        output_path = self._worker.output_path.joinpath(filename)
+        self._worker.writer.submit(save_image, to_save, output_path, codec)
+
+    def save_frame(self):
+        """
+        Queues materialising the current sample's captured game frame in the
+            output folder, or records its source path in the manifest.
+        """
+        source_path = self._frame_source_path
+        if self._frame_mode == "skip":
+            self._manifest.writerow([self._record_number, source_path])
+            return
+        destination_path = self._worker.output_path.joinpath(source_path.name)
+        writer = self._worker.writer
+        writer.submit(self._materialise_frame, source_path, destination_path)
+
+    def end_sample(self):
+        """
+        Called once all of the current sample's outputs have been queued.
+        """
+
+    def close(self):
+        """
+        Called once all of the worker's outputs have been written.
+        """
+        if self._manifest_file is not None:
+            self._manifest_file.close()
+
+    def _materialise_frame(self, source_path: Path, destination_path: Path):
+        """
+        Materialises a captured frame in the output folder, logging once if
+            the frame mode fails and frames are copied instead.
+
+        :param source_path: Path of the captured frame.
+        :type source_path: Path
+        :param destination_path: Path of the frame in the output folder.
+        :type destination_path: Path
+        """
+        mode = materialise_frame(source_path, destination_path, self._frame_mode)
+        if mode != self._frame_mode and not self._is_fallback_logged:
+            self._is_fallback_logged = True
+            logger.warning(
+                f"Can't {self._frame_mode} frames to {destination_path.parent},"
+                " copying them instead"
+            )
+
+    def _open_manifest(self):
+        """
+        Creates the worker's manifest of the source path of each frame.
+        """
+        filename = f"{self._worker.name}-frames.csv"
+        manifest_path = self._worker.output_path.joinpath(filename)
+        self._manifest_file = manifest_path.open("w", newline="")
+        self._manifest = csv.writer(self._manifest_file)
+        self._manifest.writerow(MANIFEST_COLUMNS)
+
+    @property
+    def _frame_source_path(self) -> Path:
+        """
+        Path of the current sample's captured game frame.
+        """
+        filename = self._record_number + ".jpeg"
+        return self._worker.recording_path.joinpath(filename).absolute()
+
+    @property
+    def _frame_mode(self) -> str:
+        """
+        How captured frames are materialised in the output folder.
+        """
+        return self._worker._config.get("frame_mode", "copy")
+
+    @property
+    def _record_number(self) -> str:
+        """
+        The record number of the current sample.
+        """
+        return self._worker._work["record_number"]
+
+
+class ShardOutput(FileOutput):
+    """
+    Streams each sample's outputs and captured frame into rolling tar shards,
+        WebDataset style, so a run writes a few large files instead of
+        millions of small ones. A sample's files are stored next to each
+        other, named by record number then output name, and a new shard is
+        started once the current one reaches shard_size_mb. Outputs are
+        encoded on the worker's background writer and appended to the shard
+        a sample at a time. Every member's shard, byte offset and size are
+        recorded in a CSV index per worker for random access. Captured frames
+        are stored in the shards unless frame_mode is skip.
+
+    :param worker_reference: A reference to the worker whose outputs are saved.
+    :type worker_reference: DataGenerationWorker
+    """
+
+    def __init__(self, worker_reference):
+        super().__init__(worker_reference)
+        self._members = []
+        self._lock = threading.Lock()
+        self._i_shard = 0
+        self._shard = None
+        self._open_index()
+
+    def save(self, output_name: str, to_save: np.array):
+        """
+        Queues an output of the current sample to be encoded by the worker's
+            background writer.
+
+        :param output_name: The name of the output, the member's suffix.
+        :type output_name: str
+        :param to_save: The output to save.
+        :type to_save: np.array
+        """
+        codec = self._worker.get_output_codec(output_name)
+        member_name = f"{self._record_number}.{output_name}{codec.extension}"
+        encoded = self._worker.writer.submit(codec.encode, to_save)
+        self._members.append((member_name, encoded))
+
+    def save_frame(self):
+        """
+        Queues reading the current sample's captured game frame, or records
+            its source path in the manifest.
+        """
+        if self._frame_mode == "skip":
+            return super().save_frame()
+        source_path = self._frame_source_path
+        encoded = self._worker.writer.submit(Path.read_bytes, source_path)
+        self._members.append((source_path.name, encoded))
+
+    def end_sample(self):
+        """
+        Queues appending the current sample's members to the shard once they
+            have all been encoded.
+        """
+        members, self._members = self._members, []
+        writer = self._worker.writer
+        writer.submit(self._append_sample, self._record_number, members)
+
+    def close(self):
+        """
+        Closes the current shard, the index and any manifest.
+        """
+        self._maybe_close_shard()
+        self._index_file.close()
+        super().close()
+
+    def _append_sample(self, record_number: str, members: List[Tuple[str, Future]]):
+        """
+        Appends a sample's members to the current shard, next to each other,
+            then starts a new shard if the current one is full.
+
+        :param record_number: The sample's record number.
+        :type record_number: str
+        :param members: The name of each member and a future of its contents.
+        :type members: List[Tuple[str, Future]]
+        """
+        members = [(name, encoded.result()) for name, encoded in members]
+        with self._lock:
+            if self._shard is None:
+                self._open_shard()
+            for name, data in members:
+                self._append_member(record_number, name, data)
+            self._index_file.flush()
+            if self._shard.offset >= self._shard_size:
+                self._maybe_close_shard()
+
+    def _append_member(self, record_number: str, name: str, data: bytes):
+        """
+        Appends a file to the current shard and records it in the index. Each
+            member has a single header block as shards use the ustar format.
+
+        :param record_number: The sample's record number.
+        :type record_number: str
+        :param name: The member's name.
+        :type name: str
+        :param data: The member's contents.
+        :type data: bytes
+        """
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        header_offset = self._shard.offset
+        self._shard.addfile(info, io.BytesIO(data))
+        offset = header_offset + tarfile.BLOCKSIZE
+        row = [record_number, self._shard_path.name, name, offset, info.size]
+        self._index.writerow(row)
+
+    def _open_shard(self):
+        """
+        Starts the next shard.
+        """
+        self._shard_path = self._get_shard_path(self._i_shard)
+        self._shard = tarfile.open(self._shard_path, "w", format=tarfile.USTAR_FORMAT)
+        self._i_shard += 1
+
+    def _maybe_close_shard(self):
+        """
+        Closes the current shard if one is open.
+        """
+        if self._shard is not None:
+            self._shard.close()
+            self._shard = None
+
+    def _open_index(self):
+        """
+        Creates the worker's index of every member written to its shards.
+        """
+        index_path = self._worker.output_path.joinpath(f"{self._prefix}-index.csv")
+        self._index_file = index_path.open("w", newline="")
+        self._index = csv.writer(self._index_file)
+        self._index.writerow(INDEX_COLUMNS)
+
+    def _get_shard_path(self, i_shard: int) -> Path:
+        """
+        Returns the path of one of the worker's shards.
+
+        :param i_shard: Index of the shard.
+        :type i_shard: int
+        :return: Path of the shard.
+        :rtype: Path
+        """
+        return self._worker.output_path.joinpath(f"{self._prefix}-{i_shard:06d}.tar")
+
+    @property
+    def _prefix(self) -> str:
+        """
+        Prefix of the worker's shard and index filenames, unique per worker.
+        """
+        return self._worker.name
+
+    @property
+    def _shard_size(self) -> int:
+        """
+        Size in bytes after which a shard is closed and a new one started.
+        """
+        return int(self._worker._config.get("shard_size_mb", 1024) * 2**20)
+
+
+class MemmapOutput(FileOutput):
+    """
+    Writes each sample's outputs unencoded into the sample's row of one
+        memory mapped .npy array per output, <output>.npy, preallocated by
+        create_memmap_store before the workers start. The row of each record
+        number is listed in records.csv. Captured frames are materialised in
+        the output folder as with the files format.
+
+    :param worker_reference: A reference to the worker whose outputs are saved.
+    :type worker_reference: DataGenerationWorker
+    """
+
+    def __init__(self, worker_reference):
+        super().__init__(worker_reference)
+        self._store = {}
+        self._load_rows()
+
+    def save(self, output_name: str, to_save: np.array):
+        """
+        Queues an output of the current sample to be written into its row by
+            the worker's background writer.
+
+        :param output_name: The name of the output, the array's filename.
+        :type output_name: str
+        :param to_save: The output to save.
+        :type to_save: np.array
+        """
+        store = self._get_store(output_name)
+        row = self._rows[self._record_number]
+        self._worker.writer.submit(write_row, store, row, to_save)
+
+    def close(self):
+        """
+        Flushes every array written to and closes any manifest.
+        """
+        [store.flush() for store in self._store.values()]
+        super().close()
+
+    def _get_store(self, output_name: str) -> np.memmap:
+        """
+        Returns the memory mapped array of an output, opening it on first use.
+
+        :param output_name: The name of the output, the array's filename.
+        :type output_name: str
+        :return: The output's memory mapped array.
+        :rtype: np.memmap
+        """
+        if output_name not in self._store:
+            path = self._worker.output_path.joinpath(output_name + ".npy")
+            self._store[output_name] = np.load(path, mmap_mode="r+")
+        return self._store[output_name]
+
+    def _load_rows(self):
+        """
+        Loads the row of each record number in the arrays.
+        """
+        index_path = self._worker.output_path.joinpath(MEMMAP_INDEX_FILENAME)
+        with index_path.open(newline="") as file:
+            rows = csv.DictReader(file)
+            self._rows = {row["record_number"]: int(row["row"]) for row in rows}
+
+
+OUTPUT_FORMATS = {
+    "files": FileOutput,
+    "shards": ShardOutput,
+    "memmap": MemmapOutput,
+}
+
+
+def write_row(store: np.memmap, row: int, to_save: np.array):
+    """
+    Writes an output into a row of a memory mapped array.
+
+    :param store: The output's memory mapped array.
+    :type store: np.memmap
+    :param row: The row to write to.
+    :type row: int
+    :param to_save: The output to write.
+    :type to_save: np.array
+    """
+    store[row] = to_save
+
+
+def create_memmap_store(
+    output_path: Path,
+    record_numbers: List[str],
+    outputs: Dict[str, Tuple[int, type]],
+    image_size: List[int],
+):
+    """
+    Preallocates a memory mapped .npy array for each output with a row per
+        record, shape (N, H, W) or (N, H, W, C), and writes the index of
+        each record number's row to records.csv.
+
+    :param output_path: Folder to create the arrays and index in.
+    :type output_path: Path
+    :param record_numbers: Record number of each row.
+    :type record_numbers: List[str]
+    :param outputs: Each output's number of channels, 0 for a single channel,
+        and data type, keyed by output name.
+    :type outputs: Dict[str, Tuple[int, type]]
+    :param image_size: Width and height of the outputs in pixels.
+    :type image_size: List[int]
+    """
+    width, height = image_size
+    for output_name, (channels, dtype) in outputs.items():
+        shape = (len(record_numbers), height, width)
+        if channels > 0:
+            shape = (*shape, channels)
+        path = output_path.joinpath(output_name + ".npy")
+        np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape).flush()
+    with output_path.joinpath(MEMMAP_INDEX_FILENAME).open("w", newline="") as file:
+        index = csv.writer(file)
+        index.writerow(["row", "record_number"])
+        index.writerows(enumerate(record_numbers))
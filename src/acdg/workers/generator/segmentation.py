@@ -1,46 +1,41 @@
-from acdg.tracks import TRACK_DATA
 from acdg.tracks.constants import COLOUR_LIST, TRAIN_ID_LIST
 from acdg.utils.load import load_image
 from acdg.workers.generator.base import DataGenerator
-from acdg.workers.generator.utils import allocate_empty_frame, rgb_to_bgr
 import cv2
 import numpy as np
-import trimesh
+
+OVERLAY_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
 
 
 class SegmentationGenerator(DataGenerator):
+    outputs = {
+        "visuals": {"seg_colour": (3, np.uint8)},
+        "data": {"trainids": (0, np.uint8)},
+        "overlays": {"seg_overlay": (3, np.uint8)},
+    }
+
     def generate(self):
         """
-        Calls all methods registered in configuration to generate normal data.
+        Calls all methods registered in configuration to generate segmentation
+            data.
         """
-        pixel_ids = self._get_semantic_pixel_ids()
+        i_triangles = self._i_triangles.reshape(self._image_shape)
         for method in self._generation_methods:
-            method(pixel_ids)
+            method(i_triangles)
 
-    def _get_semantic_pixel_ids(self) -> np.array:
-        """
-        Returns a semantic id for each pixel in the image.
-
-        :return: A semantic id map of the image.
-        :rtype: np.array
-        """
-        i_tri = np.copy(self._i_triangles)
-        i_tri[i_tri != -1] = self._triangle_to_id[i_tri[i_tri != -1]]
-        if self._is_generating_depth:
-            pixel_ids = -1 * (allocate_empty_frame(*self._image_size) + 1)
-            self._insert_values_into_image(i_tri, pixel_ids)
-        else:
-            pixel_ids = i_tri.reshape(self._image_size)
-        return pixel_ids
-
-    def _generate_visualised_semantics(self, pixel_ids: np.array):
+    def _generate_visualised_semantics(self, i_triangles: np.array):
         """
         Generates a visualised semantic map of the image and saves it.
 
-        :param pixel_ids: A semantic id map.
-        :type pixel_ids: np.array
+        :param i_triangles: Index of the triangle hit at each pixel.
+        :type i_triangles: np.array
         """
-        visualised_map = get_visualised_semantics(pixel_ids)
+        visualised_map = np.take(self._triangle_to_colour, i_triangles, axis=0)
         self._save_colour_map(visualised_map)
 
     def _save_colour_map(self, colour_map: np.array):
@@ -50,16 +45,16 @@ class SegmentationGenerator(DataGenerator):
         :param colour_map: A visualised semantic map
         :type colour_map: np.array
         """
-        self._save_data(f"{self._record_number}-seg_colour.png", colour_map)
+        self._save_data("seg_colour", colour_map)
 
-    def _generate_semantic_training_data(self, pixel_ids: np.array):
+    def _generate_semantic_training_data(self, i_triangles: np.array):
         """
         Generates semantic segmentation training data and saves it.
 
-        :param pixel_ids: A semantic id map.
-        :type pixel_ids: np.array
+        :param i_triangles: Index of the triangle hit at each pixel.
+        :type i_triangles: np.array
         """
-        id_map = get_semantic_training_data(pixel_ids)
+        id_map = self._triangle_to_train_id[i_triangles]
         self._save_segmentation_map(id_map)
 
     def _save_segmentation_map(self, ids_map: np.array):
@@ -69,22 +64,26 @@ class SegmentationGenerator(DataGenerator):
         :param ids_map: Semantic segmentation training data
         :type ids_map: np.array
         """
-        self._save_data(f"{self._record_number}-trainids.png", ids_map)
+        self._save_data("trainids", ids_map)
 
-    def _generate_overlaid_visualisation(self, pixel_ids: np.array):
+    def _generate_overlaid_visualisation(self, i_triangles: np.array):
         """
         Overlays the visualised semantic map ontop of the captured frame and
-            saves it.
-
-        :param pixel_ids: A semantic id map.
-        :type pixel_ids: np.array
-        """
-        image = load_image(self._captured_frame_path)
-        overlaid = get_overlaid_segmentation_visualisation(
-            pixel_ids,
-            image,
-            not self._is_generating_depth,
-        )
+            saves it, for records whose number is a multiple of overlay_every.
+            The frame is decoded at 1 / overlay_scale of its size by the JPEG
+            decoder and the map is sampled at the same scale, so only the
+            reduced image is coloured and blended.
+
+        :param i_triangles: Index of the triangle hit at each pixel.
+        :type i_triangles: np.array
+        """
+        if int(self._record_number) % self._overlay_every != 0:
+            return
+        scale = self._overlay_scale
+        image = load_image(self._captured_frame_path, OVERLAY_DECODE_FLAGS[scale])
+        i_triangles = i_triangles[::scale, ::scale]
+        visualised_map = np.take(self._triangle_to_colour, i_triangles, axis=0)
+        overlaid = get_overlaid_segmentation_visualisation(visualised_map, image)
         self._save_overlaid_visualisation(overlaid)
 
     def _save_overlaid_visualisation(self, overlaid: np.array):
@@ -94,22 +93,45 @@ class SegmentationGenerator(DataGenerator):
         :param overlaid: Overlaid visualisation
         :type overlaid: np.array
         """
-        self._save_data(f"{self._record_number}-seg_overlay.png", overlaid)
+        self._save_data("seg_overlay", overlaid)
+
+    @property
+    def _overlay_scale(self) -> int:
+        """
+        Factor overlays are reduced in size by, 1, 2, 4 or 8.
+
+        :return: Factor overlays are reduced in size by.
+        :rtype: int
+        """
+        return self._worker._config.get("overlay_scale", 1)
+
+    @property
+    def _overlay_every(self) -> int:
+        """
+        Overlays are generated for records whose number is a multiple of this.
+
+        :return: Record number interval overlays are generated at.
+        :rtype: int
+        """
+        return self._worker._config.get("overlay_every", 1)
 
     def _setup(self):
         """
         Specific setup steps for SegmentationGenerator.
         """
-        self._setup_triangle_to_id_map()
+        self._setup_triangle_lookup_tables()
         self._register_generation_methods()
 
-    def _setup_triangle_to_id_map(self):
+    def _setup_triangle_lookup_tables(self):
         """
-        Creates a mapping between triangle indexes and their semantic class
+        Creates lookup tables mapping triangle indexes straight to train ids
+            and visualisation colours, from the compiled track's triangle to
+            semantic class lookup table. Each has an extra last entry for
+            pixels that missed, indexed by -1.
         """
-        scene, track_name = self._worker._scene, self._worker.track_name
-        triangle_to_id = get_triangle_to_semantic_id_map(scene, track_name)
-        self._triangle_to_id = triangle_to_id
+        semantic_ids = self._worker._track_arrays["triangle_to_semantic_id"]
+        self._triangle_to_train_id = create_triangle_to_train_id_map(semantic_ids)
+        self._triangle_to_colour = create_triangle_to_colour_map(semantic_ids)
 
     def _register_generation_methods(self):
         """
@@ -127,73 +149,62 @@ class SegmentationGenerator(DataGenerator):
             self._generation_methods.append(method)
 
 
-def get_triangle_to_semantic_id_map(
-    scene: trimesh.Scene,
-    track_name: str,
-) -> np.array:
+def create_triangle_to_train_id_map(triangle_to_semantic_id: np.array) -> np.array:
     """
-    Returns a mapping between triangle indexes and the semantic ID of
-        that triangle's geometry.
+    Returns a mapping between triangle indexes and train ids, with a last
+        entry of the void class's train id for rays that missed.
 
-    :param scene: The trimesh.Scene object for the track
-    :type scene: trimesh.Scene
-    :return: Triangle index to semantic class id map
+    :param triangle_to_semantic_id: Triangle index to semantic class id map.
+    :type triangle_to_semantic_id: np.array
+    :return: Triangle index to train id map (F + 1,).
     :rtype: np.array
     """
-    triangle_to_node = scene.triangles_node
-    material_to_id = TRACK_DATA[track_name].material_to_id
-    triangle_to_id = [material_to_id[name] for name in triangle_to_node]
-    return np.asarray(triangle_to_id, dtype=np.uint8)
+    semantic_ids = append_miss_semantic_id(triangle_to_semantic_id)
+    return TRAIN_ID_LIST[semantic_ids].astype(np.uint8)
 
 
-def get_semantic_training_data(pixel_ids: np.array) -> np.array:
+def create_triangle_to_colour_map(triangle_to_semantic_id: np.array) -> np.array:
     """
-    Maps pixel ids to semantic ids, returning semantic segmentation training
-        data.
+    Returns a mapping between triangle indexes and the BGR colour of their
+        semantic class for visualisation, with a last entry of the void
+        class's colour for rays that missed.
 
-    :param pixel_ids: A semantic id map.
-    :type pixel_ids: np.array
-    :return: Semantic segmentation training data
+    :param triangle_to_semantic_id: Triangle index to semantic class id map.
+    :type triangle_to_semantic_id: np.array
+    :return: Triangle index to BGR colour map (F + 1, 3).
     :rtype: np.array
     """
-    id_map = np.array(TRAIN_ID_LIST[pixel_ids], dtype=np.uint8)
-    return id_map
+    semantic_ids = append_miss_semantic_id(triangle_to_semantic_id)
+    return np.ascontiguousarray(COLOUR_LIST[:, ::-1][semantic_ids])
 
 
-def get_visualised_semantics(pixel_ids: np.array) -> np.array:
+def append_miss_semantic_id(triangle_to_semantic_id: np.array) -> np.array:
     """
-    Maps pixel ids to a colour specific to semantic classes for visualisation.
+    Appends the void class's semantic id, the last entry of TRAIN_ID_LIST and
+        COLOUR_LIST, so a triangle index of -1 maps to void.
 
-    :param pixel_ids: A semantic id map.
-    :type pixel_ids: np.array
-    :return: Visualised segmentation map
+    :param triangle_to_semantic_id: Triangle index to semantic class id map.
+    :type triangle_to_semantic_id: np.array
+    :return: Triangle index to semantic class id map (F + 1,).
     :rtype: np.array
     """
-    visualised_map = np.array(COLOUR_LIST[pixel_ids], dtype=np.uint8)
-    visualised_map = rgb_to_bgr(visualised_map)
-    return visualised_map
+    void_id = len(TRAIN_ID_LIST) - 1
+    return np.append(triangle_to_semantic_id.astype(np.int64), void_id)
 
 
 def get_overlaid_segmentation_visualisation(
-    pixel_ids: np.array,
+    visualised_semantics: np.array,
     image: np.array,
-    flipud: bool,
 ) -> np.array:
     """
     Overlays the visualised semantic segmentation map onto the corresponding
         game frame.
 
-    :param pixel_ids: A semantic id map.
-    :type pixel_ids: np.array
+    :param visualised_semantics: A visualised semantic map.
+    :type visualised_semantics: np.array
     :param image: Game frame to be overlaid.
     :type image: np.array
-    :param flipud: Whether to flip the image along the horizontal axis.
-    :type flipud: bool
     :return: Overlaid combination of colour map and frame
     :rtype: np.array
     """
-    visualised_semantics = get_visualised_semantics(pixel_ids)
-    image = np.rot90(image, axes=(1, 0))
-    if flipud:
-        image = np.flipud(image)
     return cv2.addWeighted(image, 0.5, visualised_semantics, 0.5, 0.0)
@@ -1,10 +1,18 @@
 import multiprocessing as mp
-import shutil
-from typing import Dict
+from typing import Dict, Tuple
 
 from acdg.workers.base import BaseWorker, WorkerSharedState
+from acdg.workers.frames import FRAME_SCHEMA_VERSION
 from acdg.workers.generator import depth, normals, segmentation
-
+from acdg.workers.generator.codecs import (
+    OutputCodec,
+    create_output_codec,
+    get_default_codec_settings,
+)
+from acdg.workers.generator.outputs import OUTPUT_FORMATS, FileOutput
+from acdg.workers.generator.writer import BackgroundWriter
+
+TRACK_LOOKUP_TABLES = ["triangle_to_semantic_id", "triangle_to_normal"]
 DATA_GENERATORS = {
     "depth": depth.DepthMapGenerator,
     "normals": normals.NormalMapGenerator,
@@ -26,6 +34,7 @@ class DataGenerationWorker(BaseWorker):
     def __init__(self, configuration: Dict, shared_state: WorkerSharedState):
         super().__init__(configuration, shared_state)
         self._data_generators = []
+        self._output_codecs = {}
 
     def _is_work_complete(self) -> bool:
         """
@@ -38,26 +47,99 @@ class DataGenerationWorker(BaseWorker):
 
     def _do_work(self):
         """
-        Perform the data generation work.
+        Perform the data generation work for the job's frame slot, then free
+            the slot for ray casters to reuse.
         """
+        self._select_frame_slot()
         self._save_ground_truth_data()
+        self._release_frame_slot()
         self.increment_n_complete()
 
+    def _select_frame_slot(self):
+        """
+        View the ray casting results in the job's frame slot without copying.
+
+        :raises ValueError: If the job was created for a different frame
+            schema version.
+        """
+        if self._work["version"] != FRAME_SCHEMA_VERSION:
+            version = self._work["version"]
+            raise ValueError(f"Unsupported generation job version {version}")
+        i_slot = self._work["i_slot"]
+        self._frame = {name: slots[i_slot] for name, slots in self._frame_slots.items()}
+
+    def _release_frame_slot(self):
+        """
+        Return the job's frame slot to the pool of free frame slots.
+        """
+        self._frame = None
+        self.free_frame_slots.put(self._work["i_slot"])
+
     def _save_ground_truth_data(self):
         """
         For each of the registered data generators, generate and save data.
         """
         [data_generator.generate() for data_generator in self._data_generators]
-        self._copy_frame()
+        self._output.save_frame()
+        self._output.end_sample()
+
+    def get_output_codec(self, output_name: str) -> OutputCodec:
+        """
+        Get the codec an output is encoded with, configured under
+            output_codecs by the output's name. If not configured outputs are
+            saved as PNG images, or .npy files if PNG can't store them.
+
+        :param output_name: The name of the output, the file's suffix.
+        :type output_name: str
+        :return: The codec the output is encoded with.
+        :rtype: OutputCodec
+        """
+        if output_name not in self._output_codecs:
+            channels, dtype = self._generated_outputs[output_name]
+            settings = get_default_codec_settings(channels, dtype)
+            self._output_codecs[output_name] = create_output_codec(settings)
+        return self._output_codecs[output_name]
 
-    def _copy_frame(self):
+    @property
+    def output(self) -> FileOutput:
+        """
+        Get the output this worker's samples are saved to.
+
+        :return: The worker's output.
+        :rtype: FileOutput
+        """
+        return self._output
+
+    @property
+    def writer(self) -> BackgroundWriter:
         """
-        Copy the records captured game frame to the output directory.
+        Get the background writer this worker's outputs are saved through.
+
+        :return: The worker's background writer.
+        :rtype: BackgroundWriter
+        """
+        return self._writer
+
+    @property
+    def n_writer_threads(self) -> int:
+        """
+        Get the number of threads writing this worker's outputs.
+
+        :return: The number of threads writing this worker's outputs.
+        :rtype: int
         """
-        filename = self._record_number + ".jpeg"
-        source_path = self.recording_path.joinpath(filename)
-        destination_path = self.output_path.joinpath(filename)
-        shutil.copyfile(source_path, destination_path)
+        return self._config.get("n_writer_threads", 2)
+
+    @property
+    def max_pending_writes(self) -> int:
+        """
+        Get the maximum number of this worker's outputs waiting to be written
+            before generating more blocks.
+
+        :return: The maximum number of outputs waiting to be written.
+        :rtype: int
+        """
+        return self._config.get("max_pending_writes", 4 * self.n_writer_threads)
 
     @property
     def _job_queue(self) -> mp.Queue:
@@ -83,10 +165,48 @@ class DataGenerationWorker(BaseWorker):
         """
         Setup steps specific to the data generation worker.
         """
-        self._setup_scene()
+        self._setup_track_arrays(TRACK_LOOKUP_TABLES)
+        self._setup_frame_slots()
+        self._setup_writer()
+        self._setup_output_codecs()
+        self._setup_output()
         self._setup_data_generators()
         self.set_as_ready()
 
+    def _teardown(self):
+        """
+        Wait until all of the worker's outputs are written.
+        """
+        self._writer.shutdown()
+        self._output.close()
+
+    def _setup_writer(self):
+        """
+        Create the background writer that encodes and writes outputs while
+            the next job is generated.
+        """
+        self._writer = BackgroundWriter(
+            self.n_writer_threads,
+            self.max_pending_writes,
+        )
+
+    def _setup_output_codecs(self):
+        """
+        Create the codec of each output configured under output_codecs.
+        """
+        self._generated_outputs = get_generated_outputs(self._config)
+        output_codecs = self._config.get("output_codecs", {})
+        for output_name, settings in output_codecs.items():
+            self._output_codecs[output_name] = create_output_codec(settings)
+
+    def _setup_output(self):
+        """
+        Create the output samples are saved to, individual files unless
+            output_format is set.
+        """
+        output_format = self._config.get("output_format", "files")
+        self._output = OUTPUT_FORMATS[output_format](self)
+
     def _setup_data_generators(self):
         """
         For each type of data specified in the configuration instance a
@@ -105,3 +225,21 @@ class DataGenerationWorker(BaseWorker):
         """
         data_generator = DATA_GENERATORS[data_type](self)
         self._data_generators.append(data_generator)
+
+
+def get_generated_outputs(configuration: Dict) -> Dict[str, Tuple[int, type]]:
+    """
+    Returns every output saved for each sample by the data generators and
+        generation methods in a configuration.
+
+    :param configuration: The workers' configuration.
+    :type configuration: Dict
+    :return: Each output's number of channels, 0 for a single channel, and
+        data type, keyed by output name.
+    :rtype: Dict[str, Tuple[int, type]]
+    """
+    generated_outputs = {}
+    for data_type, methods in configuration["generate"].items():
+        outputs = DATA_GENERATORS[data_type].get_outputs(configuration)
+        [generated_outputs.update(outputs.get(method, {})) for method in methods]
+    return generated_outputs
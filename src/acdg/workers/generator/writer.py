@@ -0,0 +1,78 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+from typing import Callable, List
+
+
+class BackgroundWriter:
+    """
+    Encodes and writes a worker's outputs on a bounded pool of threads, so the
+        worker can generate the next frame while the previous frame's files
+        are being written. cv2 releases the GIL while encoding and writing so
+        the threads run in parallel with the worker. Submitting blocks once
+        max_pending writes are queued or in progress, bounding the memory
+        held by arrays waiting to be written. With no threads each write is
+        done on the calling thread.
+
+    :param n_threads: Number of threads writing outputs.
+    :type n_threads: int
+    :param max_pending: Maximum number of writes queued or in progress.
+    :type max_pending: int
+    """
+
+    def __init__(self, n_threads: int, max_pending: int):
+        self._n_threads = n_threads
+        self._pending = threading.BoundedSemaphore(max(max_pending, 1))
+        self._futures: List[Future] = []
+        self._thread_pool = None
+        if n_threads > 0:
+            self._thread_pool = ThreadPoolExecutor(max_workers=n_threads)
+
+    def submit(self, write: Callable, *args) -> Future:
+        """
+        Queues a write, waiting for a pending write to finish if max_pending
+            are already queued. Arrays passed must not be modified afterwards.
+            Raises the exception of any earlier write that failed.
+
+        :param write: Function that encodes and writes an output.
+        :type write: Callable
+        :return: A future holding the value returned by the write.
+        :rtype: Future
+        """
+        if self._thread_pool is None:
+            future = Future()
+            future.set_result(write(*args))
+            return future
+        self._raise_failed_writes()
+        self._pending.acquire()
+        future = self._thread_pool.submit(write, *args)
+        future.add_done_callback(lambda _: self._pending.release())
+        self._futures.append(future)
+        return future
+
+    def flush(self):
+        """
+        Waits until every queued write has finished, raising the exception of
+            any that failed.
+        """
+        futures, self._futures = self._futures, []
+        [future.result() for future in futures]
+
+    def shutdown(self):
+        """
+        Flushes every queued write and stops the writing threads.
+        """
+        self.flush()
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown()
+
+    def _raise_failed_writes(self):
+        """
+        Forgets writes that have finished, raising the exception of any that
+            failed.
+        """
+        futures, self._futures = self._futures, []
+        for future in futures:
+            if future.done():
+                future.result()
+            else:
+                self._futures.append(future)
@@ -1,13 +1,12 @@
 import math
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 from acdg.cars import CAR_DATA
+from acdg.mesh import TrackBundle
+import numpy as np
 from scipy.spatial.transform import Rotation
 import trimesh
 
-# Set trimesh's rotation order to extrinsic xyz
-trimesh.transformations.euler_matrix.__defaults__ = ("sxyz",)
-
 
 def calculate_horizontal_fov(
     vertical_fov: float,
@@ -32,49 +31,121 @@ def calculate_horizontal_fov(
     return math.degrees(2 * math.atan(width / focal_length))
 
 
-def convert_scene_to_collision_mesh(
-    scene: trimesh.Scene,
+def create_collision_mesh(
+    vertices: np.array,
+    faces: np.array,
 ) -> trimesh.ray.ray_pyembree.RayMeshIntersector:
     """
-    Concatenates all the geometry nodes in a scene into a single trimesh.Mesh
-        object and instantiates a RayMeshIntersector with it. The triangle
-        indexes of the concatenated mesh align with the original scene, so
-        collisions returned my the mesh intersector and be used index the scene
-        which they are made from.
+    Creates a single trimesh.Trimesh object from a compiled track's
+        concatenated vertices and faces and instantiates a RayMeshIntersector
+        with it. The mesh is not processed, so triangle indexes returned by the
+        mesh intersector can be used to index the compiled track's per
+        triangle tables. The acceleration structure is built once here and
+        can be shared by threads casting rays concurrently.
+
+    :param vertices: Concatenated vertices of the compiled track.
+    :type vertices: np.array
+    :param faces: Concatenated faces of the compiled track.
+    :type faces: np.array
+    :return: A RayMeshIntersector instance using the mesh.
+    :rtype: trimesh.ray.ray_pyembree.RayMeshIntersector
+    """
+    mesh = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+    intersector = trimesh.ray.ray_pyembree.RayMeshIntersector(mesh)
+    warm_up_intersector(intersector)
+    return intersector
 
 
-    :param scene: The trimesh.Scene to convert.
-    :type scene: trimesh.Scene
-    :return: A RayMeshIntersector instance using the converted mesh.
-    :rtype: trimesh.ray.ray_pyembree.RayMeshIntersector
+def warm_up_intersector(intersector: trimesh.ray.ray_pyembree.RayMeshIntersector):
     """
-    meshes = [mesh for mesh in scene.geometry.values()]
-    mesh = trimesh.util.concatenate(meshes)
-    return trimesh.ray.ray_pyembree.RayMeshIntersector(mesh)
+    Casts a single ray so the intersector builds its BVH now, rather than
+        lazily from whichever thread casts rays first.
+
+    :param intersector: The mesh intersector to build the BVH of.
+    :type intersector: trimesh.ray.ray_pyembree.RayMeshIntersector
+    """
+    origin = np.zeros((1, 3), dtype=np.float32)
+    direction = np.array([[0.0, 0.0, -1.0]], dtype=np.float32)
+    intersector.intersects_first(origin, direction)
 
 
-def get_camera_rotation(state: Dict, car_name: str) -> List[float]:
+def create_camera_rays(
+    image_size: List[int],
+    fov: Tuple[float, float],
+) -> np.array:
+    """
+    Creates a unit direction vector for each pixel's ray in the camera frame,
+        looking down the negative z axis. These only depend on the resolution
+        and field of view so are created once and rotated into the world frame
+        for each camera pose. Rays are ordered in the layout of saved images,
+        row by row from the top of the image and left to right along each
+        row, so per ray results reshape straight to (height, width) images.
+
+    :param image_size: Image width and height in pixels.
+    :type image_size: List[int]
+    :param fov: Horizontal and vertical field of view in degrees.
+    :type fov: Tuple[float, float]
+    :return: Ray directions in the camera frame (n, 3) as float32.
+    :rtype: np.array
+    """
+    camera = trimesh.scene.Camera(resolution=image_size, fov=fov)
+    directions, _ = camera.to_rays()
+    width, height = image_size
+    directions = directions.reshape(width, height, 3).transpose(1, 0, 2)
+    return np.ascontiguousarray(directions.reshape(-1, 3), dtype=np.float32)
+
+
+def calculate_hit_distances(
+    origins: np.array,
+    directions: np.array,
+    i_triangles: np.array,
+    track: TrackBundle,
+) -> np.array:
+    """
+    Calculates the distance along each ray to where it hit the first triangle
+        in its path, by intersecting the ray with the plane of that triangle.
+
+    :param origins: Origin of each ray (n, 3).
+    :type origins: np.array
+    :param directions: Unit direction vector of each ray (n, 3).
+    :type directions: np.array
+    :param i_triangles: Index of the triangle each ray hit, -1 for a miss.
+    :type i_triangles: np.array
+    :param track: Compiled track the rays were cast against.
+    :type track: TrackBundle
+    :return: Distance along each ray to its hit, infinite for a miss.
+    :rtype: np.array
+    """
+    distances = np.full(len(i_triangles), np.inf, dtype=np.float32)
+    is_hit = i_triangles != -1
+    i_hit = i_triangles[is_hit]
+    normals = track.triangle_to_normal[i_hit]
+    to_plane = track.vertices[track.faces[i_hit, 0]] - origins[is_hit]
+    along_normal = np.einsum("ij,ij->i", directions[is_hit], normals)
+    distances[is_hit] = np.einsum("ij,ij->i", to_plane, normals) / along_normal
+    return distances
+
+
+def get_camera_rotation(state: Dict, car_name: str) -> np.array:
     """
     Extracts the camera's rotation from a game capture state dictionary.
-        Assetto Corsa uses intrinsic yxz rotations that need to be converted
-        to extrinsic xyz for trimesh. Cars defined in the game can contain an
-        additional pitch offset applied in the car coordinate frame that is
-        accounted for here.
+        Assetto Corsa uses intrinsic yxz rotations that are composed here into
+        a rotation matrix from the camera frame to the world frame. Cars
+        defined in the game can contain an additional pitch offset applied in
+        the car coordinate frame that is accounted for here.
 
     :param state: The game capture state dictionary.
     :type state: Dict
     :param car_name: The name of the car.
     :type car_name: str
-    :return: A list of Euler angles in radians representing the camera's
-        extrinsic rotation about the x, y, and z axes in that order.
-    :rtype: List[float]
+    :return: A 3x3 matrix rotating camera frame vectors into the world frame.
+    :rtype: np.array
     """
     pitch_offset = CAR_DATA[car_name].camera_pitch
     car_rotation = get_car_rotation(state)
     camera_pitch = Rotation.from_euler("X", pitch_offset, degrees=True)
     camera_rotation = car_rotation * camera_pitch
-    extrinsic_euler_angles = camera_rotation.as_euler("xyz", degrees=False)
-    return extrinsic_euler_angles.tolist()
+    return camera_rotation.as_matrix()
 
 
 def get_camera_location(state: Dict, car_name: str) -> List[float]:
@@ -1,11 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
 import multiprocessing as mp
-from typing import Dict
+import queue
+from typing import Dict, Optional, Tuple
 
 from acdg.utils.load import load_game_state
-from acdg.workers.base import BaseWorker
+from acdg.workers.base import QUEUE_TIMEOUT, BaseWorker
+from acdg.workers.frames import FRAME_SCHEMA_VERSION
 from acdg.workers.ray_caster.utils import (
+    calculate_hit_distances,
     calculate_horizontal_fov,
-    convert_scene_to_collision_mesh,
+    create_camera_rays,
+    create_collision_mesh,
     get_camera_location,
     get_camera_rotation,
 )
@@ -37,110 +42,186 @@ class RayCastingWorker(BaseWorker):
 
     def _do_work(self):
         """
-        Perform ray casting and submit a generation job.
+        Perform ray casting for a batch of records and submit a generation job
+            for each of them.
         """
+        self._receive_batch()
         self._cast_rays()
-        self._submit_generation_job()
+        self._submit_generation_jobs()
+
+    def _receive_batch(self):
+        """
+        Take up to ray_casting_batch_size records from the job queue, including
+            the one already received, without waiting for more to arrive.
+        """
+        self._batch = [self._work]
+        while len(self._batch) < self.batch_size:
+            try:
+                self._batch.append(self._job_queue.get_nowait())
+            except queue.Empty:
+                break
 
     def _cast_rays(self):
         """
-        Adjust the camera's pose and update the ray intersections.
+        Adjust the camera's pose for each record in the batch and update the
+            ray intersections.
         """
-        self._adjust_camera()
+        self._adjust_cameras()
         self._update_ray_intersections()
 
-    def _adjust_camera(self):
+    def _adjust_cameras(self):
         """
-        Adjust the camera's pose in the scene.
+        Build one contiguous array of the rays cast for every record in the
+            batch.
         """
-        state_path = self.recording_path.joinpath(self._record_number + ".bin")
-        state = load_game_state(state_path)
-        self._scene.set_camera(
-            angles=get_camera_rotation(state, self.car_name),
-            center=get_camera_location(state, self.car_name),
-            resolution=self.image_size,
-            distance=0.0,
-            fov=self.fov,
-        )
-        self._set_camera_rays()
+        rays = [self._get_camera_rays(record) for record in self._batch]
+        self._batch_origins = np.concatenate([origins for origins, _ in rays])
+        self._batch_directions = np.concatenate([dirs for _, dirs in rays])
 
-    def _set_camera_rays(self):
+    def _get_camera_rays(self, record_number: str) -> Tuple[np.array, np.array]:
         """
-        Set the rays for each pixel in the current camera to the object
+        Rotate the camera frame rays into the world frame for the camera's pose
+            when a sample was recorded.
+
+        :param record_number: ID number of the sample in the recording.
+        :type record_number: str
+        :return: Origin and direction of the camera ray for each pixel.
+        :rtype: Tuple[np.array, np.array]
         """
-        # (origin, direction unit vector, pixel each ray belongs to)
-        self._camera_rays = self._scene.camera_rays()
+        state_path = self.recording_path.joinpath(record_number + ".bin")
+        state = load_game_state(state_path)
+        rotation = get_camera_rotation(state, self.car_name)
+        location = get_camera_location(state, self.car_name)
+        rotation = rotation.T.astype(np.float32)
+        directions = self._camera_ray_directions @ rotation
+        origins = np.broadcast_to(location, directions.shape)
+        return origins, directions
 
     def _update_ray_intersections(self):
         """
-        Run ray casting for the current camera and update the object.
+        Run ray casting for the cameras in the batch and update the object.
+            When generating depth the distance along each ray to its hit is
+            calculated from the plane of the triangle hit.
         """
-        self._ray_intersections = self._cast_camera_rays()
+        self._batch_i_triangles = self._cast_camera_rays()
         if self._is_generating_depth:
-            self._pixels_to_rays = self._pixels[self._i_rays]
+            self._batch_distances = calculate_hit_distances(
+                self._batch_origins,
+                self._batch_directions,
+                self._batch_i_triangles,
+                self._track,
+            )
 
-    def _cast_camera_rays(self):
+    def _cast_camera_rays(self) -> np.array:
+        """
+        Cast the batch's camera rays and get the first triangle each ray hits.
+            The rays are split into a chunk per thread, each intersected with
+            the same collision mesh.
+
+        :return: Index of the triangle each ray hit, -1 for a miss.
+        :rtype: np.array
+        """
+        n_rays = len(self._batch_origins)
+        starts = np.linspace(0, n_rays, self.n_threads + 1).astype(int)
+        chunks = zip(starts[:-1], starts[1:])
+        results = self._thread_pool.map(lambda x: self._cast_ray_chunk(*x), chunks)
+        return np.concatenate(list(results))
+
+    def _cast_ray_chunk(self, start: int, end: int) -> np.array:
+        """
+        Cast the batch's camera rays between start and end and get the first
+            triangle each ray hits.
+
+        :param start: Index of the first ray.
+        :type start: int
+        :param end: Index after the last ray.
+        :type end: int
+        :return: Index of the triangle each ray hit, -1 for a miss.
+        :rtype: np.array
+        """
+        origins = self._batch_origins[start:end]
+        directions = self._batch_directions[start:end]
+        return self._mesh.intersects_first(origins, directions)
+
+    def _submit_generation_jobs(self):
+        """
+        Submit a data generation job for each record in the batch.
         """
-        Cast camera rays and get ray intersections.
+        for i_record, record_number in enumerate(self._batch):
+            if self.is_aborted:
+                return
+            self._select_record(i_record, record_number)
+            self._submit_generation_job()
 
-        :return: list of ray intersections.
-        :rtype: list
+    def _select_record(self, i_record: int, record_number: str):
         """
-        origins, directions = self._ray_origins, self._ray_directions
-        if not self._is_generating_depth:
-            return self._mesh.intersects_first(origins, directions)
-        return self._mesh.intersects_location(origins, directions, False)
+        Set the ray intersections of a record in the batch as the current
+            record's.
+
+        :param i_record: Index of the record in the batch.
+        :type i_record: int
+        :param record_number: ID number of the sample in the recording.
+        :type record_number: str
+        """
+        self._work = record_number
+        n_rays = len(self._camera_ray_directions)
+        self._rays = slice(i_record * n_rays, (i_record + 1) * n_rays)
 
     def _submit_generation_job(self):
         """
-        Submit a data generation job to the GenerationWorker queue.
+        Write the current record's results into a free frame slot, waiting for
+            one to be released if none are free, and submit a data generation
+            job referencing it to the GenerationWorker queue.
         """
-        generation_job = self._create_generation_job()
+        i_slot = self._wait_for_free_frame_slot()
+        if i_slot is None:
+            return
+        self._write_frame_slot(i_slot)
+        generation_job = self._create_generation_job(i_slot)
         self.generation_queue.put(generation_job)
 
-    def _create_generation_job(self) -> Dict:
-        """
-        Packs information required by the DataGenerationWorker to create data
-            from triangle intersections into a dictionary.
+    def _wait_for_free_frame_slot(self) -> Optional[int]:
         """
-        generation_job = {
-            "record_number": self._record_number,
-            "i_triangles": self._i_triangles,
-        }
-        self._maybe_add_depth_generation_information(generation_job)
-        return generation_job
+        Wait until a frame slot is released, checking periodically whether the
+            run has been aborted so a generation worker that exits while
+            holding slots doesn't block ray casting forever.
+
+        :return: Index of the free frame slot, or None if the run was aborted.
+        :rtype: Optional[int]
+        """
+        while not self.is_aborted:
+            try:
+                return self.free_frame_slots.get(timeout=QUEUE_TIMEOUT)
+            except queue.Empty:
+                continue
+        return None
 
-    def _maybe_add_depth_generation_information(self, generation_job: Dict):
+    def _write_frame_slot(self, i_slot: int):
         """
-        If the data generation worker need to generate depth maps, ensure the
-            extra information required to do so is present in the job.
+        Copies the current record's ray casting results into a frame slot.
+            Per pixel values are in the order of the camera's rays.
 
-        :param generation_job: A dictionary containing ray casting information
-            required for downstream workers
-        :type generation_job: Dict
+        :param i_slot: Index of the frame slot to write to.
+        :type i_slot: int
         """
+        self._frame_slots["i_triangles"][i_slot] = self._batch_i_triangles[self._rays]
         if self._is_generating_depth:
-            self._add_depth_generation_information(generation_job)
+            distances = self._batch_distances[self._rays]
+            self._frame_slots["distances"][i_slot] = distances
 
-    def _add_depth_generation_information(self, generation_job: Dict):
+    def _create_generation_job(self, i_slot: int) -> Dict:
         """
-        Update the information contained in the generation job to include ray
-            hit locations (locations), the camera origin (origin), a
-            pixel to ray index mapping (pixels_to_rays), ray direction vectors
-            (ray_directions) and the index of each ray (i_rays).
+        Packs information required by the DataGenerationWorker to create data
+            from triangle intersections into a dictionary.
 
-        :param generation_job: A dictionary containing ray casting information
-            required for downstream workers
-        :type generation_job: Dict
+        :param i_slot: Index of the frame slot holding the record's results.
+        :type i_slot: int
         """
-        additional_information_for_depth_calculations = {
-            "locations": self._locations,
-            "origin": self._ray_origins[0],
-            "pixels_to_rays": self._pixels_to_rays,
-            "ray_directions": self._ray_directions,
-            "i_rays": self._i_rays,
+        return {
+            "version": FRAME_SCHEMA_VERSION,
+            "record_number": self._record_number,
+            "i_slot": i_slot,
         }
-        generation_job.update(additional_information_for_depth_calculations)
 
     @property
     def _record_number(self) -> str:
@@ -150,55 +231,25 @@ class RayCastingWorker(BaseWorker):
         return self._work
 
     @property
-    def _job_queue(self) -> mp.Queue:
-        """
-        Multiprocessing queue that the ray caster receives work from
-        """
-        return self.ray_cast_queue
-
-    @property
-    def _i_rays(self) -> np.array:
-        """
-        Index for each ray cast by camera pixels
-        """
-        return self._ray_intersections[1]
-
-    @property
-    def _i_triangles(self) -> np.array:
-        """
-        Index of each triangle hit by a given ray
-        """
-        if self._is_generating_depth:
-            return self._ray_intersections[2]
-        return self._ray_intersections
-
-    @property
-    def _locations(self) -> np.array:
+    def batch_size(self) -> int:
         """
-        3D points where rays hit a triangle
+        Number of records ray cast together in a single intersector call
         """
-        return self._ray_intersections[0]
+        return self._config.get("ray_casting_batch_size", 1)
 
     @property
-    def _pixels(self) -> np.array:
+    def n_threads(self) -> int:
         """
-        Mapping from image coordinates to rays
+        Number of threads casting rays against the worker's collision mesh
         """
-        return self._camera_rays[2]
+        return self._config.get("n_ray_casting_threads", 1)
 
     @property
-    def _ray_origins(self) -> np.array:
-        """
-        Origin of camera ray for each pixel
-        """
-        return self._camera_rays[0]
-
-    @property
-    def _ray_directions(self) -> np.array:
+    def _job_queue(self) -> mp.Queue:
         """
-        Direction of camera ray for each pixel
+        Multiprocessing queue that the ray caster receives work from
         """
-        return self._camera_rays[1]
+        return self.ray_cast_queue
 
     def _setup(self):
         """
@@ -206,8 +257,11 @@ class RayCastingWorker(BaseWorker):
         """
         self._set_depth_generation_flag()
         self._setup_field_of_view()
-        self._setup_scene()
+        self._setup_track()
+        self._setup_frame_slots()
         self._setup_collision_mesh()
+        self._setup_camera_rays()
+        self._setup_thread_pool()
         self.set_as_ready()
 
     def _set_depth_generation_flag(self):
@@ -220,7 +274,22 @@ class RayCastingWorker(BaseWorker):
         """
         Create the collision mesh to run ray casting on
         """
-        self._mesh = convert_scene_to_collision_mesh(self._scene)
+        vertices, faces = self._track.vertices, self._track.faces
+        self._mesh = create_collision_mesh(vertices, faces)
+
+    def _setup_camera_rays(self):
+        """
+        Create the camera frame ray for each pixel, which is only rotated and
+            moved to the camera's location for each sample.
+        """
+        directions = create_camera_rays(self.image_size, self.fov)
+        self._camera_ray_directions = directions
+
+    def _setup_thread_pool(self):
+        """
+        Create the pool of threads that cast chunks of each batch's rays.
+        """
+        self._thread_pool = ThreadPoolExecutor(max_workers=self.n_threads)
 
     def _setup_field_of_view(self):
         """